@@ -0,0 +1,34 @@
+import argparse
+import streamlit as st
+from pymongo import MongoClient
+from utils.db_handler import bump_data_version, ensure_indexes
+from utils.rollup import rebuild_rollup
+
+# Builds sales_daily_rollup from the existing sales. New writes keep it up to
+# date on their own (utils/sales_writer.py), so this only runs once after
+# deploying, or to repair an owner.
+
+def get_database():
+    client = MongoClient(st.secrets["MONGO_URI"])
+    return client[st.secrets["DB_NAME"]]
+
+def main(owners=None):
+    db = get_database()
+    ensure_indexes(db)
+
+    for owner_id in owners or db.sales.distinct("owner_id"):
+        rows = db.sales.count_documents({"owner_id": owner_id})
+        written = rebuild_rollup(db, owner_id)
+
+        # Cached dashboard queries were computed from the old rollup
+        bump_data_version(owner_id, db)
+
+        print(f"✔ {owner_id}: {rows} sales rows -> {written} rollup documents")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill the daily sales rollup.")
+    parser.add_argument("--owner", action="append",
+                        help="only rebuild this owner (repeatable)")
+    args = parser.parse_args()
+
+    main(args.owner)
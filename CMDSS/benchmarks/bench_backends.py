@@ -0,0 +1,55 @@
+import time
+
+from sklearn.metrics import r2_score, mean_absolute_error
+from sklearn.preprocessing import LabelEncoder
+
+from synthetic import make_sales
+from utils.features import FeatureBuilder
+from utils.inference import CATEGORICAL_COLS, FEATURE_COLS, predict_quantity
+from utils.training import BACKENDS, fit_final
+
+N_ITEMS = 100
+N_YEARS = 3
+PREDICT_BATCH = 300
+REPEATS = 5
+
+
+def load_dataset():
+    df = FeatureBuilder().transform(make_sales(N_ITEMS, 365 * N_YEARS))
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+
+    for col in CATEGORICAL_COLS:
+        df[col] = LabelEncoder().fit_transform(df[col])
+
+    # Hold out the most recent 20% of days
+    cutoff = df["date"].quantile(0.8)
+    train, test = df[df["date"] <= cutoff], df[df["date"] > cutoff]
+    return train[FEATURE_COLS], train["quantity"], test[FEATURE_COLS], test["quantity"]
+
+
+if __name__ == "__main__":
+
+    X_train, y_train, X_test, y_test = load_dataset()
+    print(f"train rows: {len(X_train)}, test rows: {len(X_test)}\n")
+
+    print(f"{'backend':>8} {'fit (s)':>8} {f'predict {PREDICT_BATCH} (ms)':>17} {'MAE':>7} {'R²':>6}")
+
+    batch = X_test.head(PREDICT_BATCH)
+
+    for backend in BACKENDS:
+        start = time.perf_counter()
+        models = fit_final(backend, X_train, y_train)
+        fit_time = time.perf_counter() - start
+
+        predict_times = []
+        for _ in range(REPEATS):
+            start = time.perf_counter()
+            predict_quantity(models, batch)
+            predict_times.append(time.perf_counter() - start)
+
+        pred = predict_quantity(models, X_test)
+
+        print(
+            f"{backend:>8} {fit_time:>8.1f} {min(predict_times) * 1000:>17.1f} "
+            f"{mean_absolute_error(y_test, pred):>7.2f} {r2_score(y_test, pred):>6.3f}"
+        )
@@ -0,0 +1,131 @@
+import time
+
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from sklearn.preprocessing import LabelEncoder
+
+from synthetic import make_sales
+from utils.encoding import CategoryEncoder
+from utils.inference import FEATURE_COLS, predict_demand
+
+ITEM_COUNTS = [10, 50, 100, 300, 600]
+N_DAYS = 60
+REPEATS = 3
+
+CONTEXT = {
+    "weather": "Rainy",
+    "exams": "None",
+    "region": "Urban",
+    "time_slot": "Morning"
+}
+
+
+def safe_encode(encoder, value):
+    # Per-value encoding the per-item loop used, unseen values became classes_[0]
+    if value in encoder.classes_:
+        return int(encoder.transform([value])[0])
+    return int(encoder.transform([encoder.classes_[0]])[0])
+
+
+def train_models(df):
+    encoders = {}
+    X = pd.DataFrame(index=df.index)
+
+    for col in ["weather", "exams", "region", "time_slot", "item"]:
+        encoders[col] = LabelEncoder()
+        X[col] = encoders[col].fit_transform(df[col])
+
+    X["day_of_week"] = df["date"].dt.weekday
+    X["week_of_year"] = df["date"].dt.isocalendar().week.astype(int)
+
+    for col in FEATURE_COLS:
+        if col not in X:
+            X[col] = df["quantity"]
+
+    rf = RandomForestRegressor(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1)
+    gb = GradientBoostingRegressor(n_estimators=100, max_depth=5, random_state=42)
+
+    rf.fit(X[FEATURE_COLS], df["quantity"])
+    gb.fit(X[FEATURE_COLS], df["quantity"])
+
+    return {
+        "backend": "rf_gb", "rf": rf, "gb": gb,
+        "encoders": encoders, "encoder": CategoryEncoder(encoders)
+    }
+
+
+def predict_per_item(df, context, models):
+    # The loop pages/Predictor.py used before the batch engine
+    rf, gb, encoders = models["rf"], models["gb"], models["encoders"]
+    results = []
+
+    next_date = df["date"].max() + pd.Timedelta(days=1)
+
+    for item in df["item"].unique():
+        item_data = df[df["item"] == item].sort_values("date")
+        quantities = item_data["quantity"].values
+
+        input_data = {
+            "weather": safe_encode(encoders["weather"], context["weather"]),
+            "exams": safe_encode(encoders["exams"], context["exams"]),
+            "region": safe_encode(encoders["region"], context["region"]),
+            "time_slot": safe_encode(encoders["time_slot"], context["time_slot"]),
+            "day_of_week": next_date.weekday(),
+            "week_of_year": int(next_date.isocalendar().week),
+            "item": safe_encode(encoders["item"], item),
+            "lag_1": quantities[-1] if len(quantities) >= 1 else 0,
+            "lag_2": quantities[-2] if len(quantities) >= 2 else 0,
+            "lag_3": quantities[-3] if len(quantities) >= 3 else 0,
+            "lag_7": quantities[-7] if len(quantities) >= 7 else 0,
+            "rolling_avg_3": item_data["quantity"].tail(3).mean(),
+            "rolling_avg_7": item_data["quantity"].tail(7).mean(),
+            "rolling_std_7": np.nan_to_num(item_data["quantity"].tail(7).std())
+        }
+
+        input_df = pd.DataFrame([input_data])[FEATURE_COLS]
+        predicted = max(0, round((rf.predict(input_df)[0] + gb.predict(input_df)[0]) / 2))
+
+        results.append({"Item": item, "Predicted Demand": predicted})
+
+    return pd.DataFrame(results)
+
+
+def encode_items_per_value(encoders, items):
+    return [safe_encode(encoders["item"], item) for item in items]
+
+
+def best_time(fn):
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == "__main__":
+
+    full = make_sales(max(ITEM_COUNTS), N_DAYS)
+    models = train_models(full)
+
+    print(f"{'items':>6} {'per-item (s)':>14} {'batch (s)':>10} {'speedup':>8}")
+
+    for n_items in ITEM_COUNTS:
+        items = full["item"].unique()[:n_items]
+        df = full[full["item"].isin(items)]
+
+        loop_time, loop_df = best_time(lambda: predict_per_item(df, CONTEXT, models))
+        batch_time, batch_df = best_time(lambda: predict_demand(df, CONTEXT, models))
+
+        expected = loop_df.set_index("Item")["Predicted Demand"].sort_index()
+        actual = batch_df.set_index("Item")["Predicted Demand"].sort_index()
+        assert (expected == actual).all(), "batch predictions diverge from per-item loop"
+
+        print(f"{n_items:>6} {loop_time:>14.3f} {batch_time:>10.3f} {loop_time / batch_time:>7.1f}x")
+
+    items = full["item"].unique()
+    loop_time, _ = best_time(lambda: encode_items_per_value(models["encoders"], items))
+    lookup_time, _ = best_time(lambda: models["encoder"].encode("item", items))
+    print(f"\nencode {len(items)} items: per-value {loop_time * 1000:.2f} ms, "
+          f"lookup table {lookup_time * 1000:.3f} ms ({loop_time / lookup_time:.0f}x)")
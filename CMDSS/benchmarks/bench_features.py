@@ -0,0 +1,39 @@
+import time
+
+from synthetic import make_sales
+from utils.features import FeatureBuilder
+
+SIZES = [(50, 365), (200, 365), (300, 1095)]
+
+
+def lambda_features(df):
+    # The per-group Python lambdas train_model.py used before FeatureBuilder
+    df = df.sort_values(["item", "date"]).copy()
+    grouped = df.groupby("item")["quantity"]
+
+    for lag in [1, 2, 3, 7]:
+        df[f"lag_{lag}"] = grouped.shift(lag)
+
+    df["rolling_avg_3"] = grouped.transform(lambda x: x.rolling(3).mean())
+    df["rolling_avg_7"] = grouped.transform(lambda x: x.rolling(7).mean())
+    df["rolling_std_7"] = grouped.transform(lambda x: x.rolling(7).std())
+
+    return df.fillna(0)
+
+
+if __name__ == "__main__":
+
+    print(f"{'rows':>9} {'lambda (s)':>11} {'native (s)':>11} {'speedup':>8}")
+
+    for n_items, n_days in SIZES:
+        df = make_sales(n_items, n_days)
+
+        start = time.perf_counter()
+        lambda_features(df)
+        lambda_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        FeatureBuilder().transform(df)
+        native_time = time.perf_counter() - start
+
+        print(f"{len(df):>9} {lambda_time:>11.3f} {native_time:>11.3f} {lambda_time / native_time:>7.1f}x")
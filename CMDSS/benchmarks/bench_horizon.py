@@ -0,0 +1,44 @@
+import time
+
+import pandas as pd
+
+from bench_batch_inference import train_models
+from synthetic import make_sales, TIME_SLOTS
+from utils.inference import forecast_horizon, predict_demand
+
+N_ITEMS = 300
+N_DAYS = 60
+HORIZONS = [1, 7, 14]
+
+
+def calendar_for(df, days):
+    first_day = df["date"].max() + pd.Timedelta(days=1)
+    return [
+        {"date": first_day + pd.Timedelta(days=i), "weather": "Sunny", "exams": "None"}
+        for i in range(days)
+    ]
+
+
+def next_day_per_slot(df, models):
+    # What the Tomorrow mode costs for the same coverage: one run per slot
+    return [
+        predict_demand(df, {"weather": "Sunny", "exams": "None", "region": "Urban", "time_slot": slot}, models)
+        for slot in TIME_SLOTS
+    ]
+
+
+if __name__ == "__main__":
+
+    df = make_sales(N_ITEMS, N_DAYS)
+    models = train_models(df)
+
+    start = time.perf_counter()
+    next_day_per_slot(df, models)
+    print(f"tomorrow, {len(TIME_SLOTS)} slots as separate runs: {time.perf_counter() - start:.2f}s")
+
+    print(f"\n{'days':>5} {'rows':>7} {'seconds':>8}")
+
+    for days in HORIZONS:
+        start = time.perf_counter()
+        forecast = forecast_horizon(df, calendar_for(df, days), "Urban", TIME_SLOTS, models)
+        print(f"{days:>5} {len(forecast):>7} {time.perf_counter() - start:>8.2f}")
@@ -0,0 +1,74 @@
+import os
+import time
+
+from pymongo import MongoClient
+
+from synthetic import make_sales
+from utils.db_handler import ensure_indexes
+
+# Needs a real mongod: mongomock has no query planner, so indexes would not
+# change its timings. Defaults to a local server and a throwaway database.
+MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "cmdss_index_bench"
+
+N_OWNERS = 50
+N_ITEMS = 40
+N_DAYS = 365
+REPEATS = 20
+
+
+def seed(db):
+    db.sales.drop()
+    db.users.drop()
+    db.feature_state.drop()
+
+    for owner in range(N_OWNERS):
+        df = make_sales(N_ITEMS, N_DAYS, owner_id=f"owner_{owner}", seed=owner)
+        db.sales.insert_many(df.to_dict("records"))
+
+    db.users.insert_many([
+        {"username": f"owner_{owner}", "password": "secret", "role": "owner", "approved": True}
+        for owner in range(N_OWNERS)
+    ])
+
+
+def time_queries(db):
+    queries = {
+        "owner sales": lambda: list(db.sales.find({"owner_id": "owner_7"}, {"_id": 0})),
+        "owner item window": lambda: list(db.sales.find(
+            {"owner_id": "owner_7", "item": "item_0003"}, {"_id": 0}
+        ).sort("date", -1).limit(7)),
+        "login": lambda: db.users.find_one({"username": "owner_7", "password": "secret"})
+    }
+
+    timings = {}
+    for name, query in queries.items():
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            query()
+        timings[name] = (time.perf_counter() - start) / REPEATS
+
+    plan = db.sales.find({"owner_id": "owner_7"}).explain()["queryPlanner"]["winningPlan"]
+    stage = plan.get("inputStage", plan).get("stage")
+
+    return timings, stage
+
+
+if __name__ == "__main__":
+
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    seed(db)
+    print(f"seeded {db.sales.estimated_document_count()} sales documents\n")
+
+    before, before_stage = time_queries(db)
+    status = ensure_indexes(db)
+    after, after_stage = time_queries(db)
+
+    print("indexes:", ", ".join(f"{name}={'yes' if ok else 'no'}" for name, ok in status.items()))
+    print(f"owner query plan: {before_stage} -> {after_stage}\n")
+
+    print(f"{'query':>18} {'no index (ms)':>14} {'indexed (ms)':>13}")
+    for name in before:
+        print(f"{name:>18} {before[name] * 1000:>14.2f} {after[name] * 1000:>13.2f}")
+
+    db.client.drop_database(DB_NAME)
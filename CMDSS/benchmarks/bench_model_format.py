@@ -0,0 +1,142 @@
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+from synthetic import make_sales
+from utils.features import FeatureBuilder
+from utils.inference import FEATURE_COLS
+from utils.model_format import load_flat_artifacts, save_flat_artifacts
+from utils.model_registry import ARTIFACTS
+
+N_ITEMS = 100
+N_DAYS = 365
+
+# What-if grid of 300 items x 36 scenarios
+PREDICT_ROWS = 300 * 36
+REPEATS = 3
+
+
+def memory_kb():
+    status = {}
+    with open("/proc/self/status") as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            if key in ("RssAnon", "RssFile"):
+                status[key] = int(value.split()[0])
+    return status
+
+
+def load_in_this_process(fmt, models_dir):
+    before = memory_kb()
+    start = time.perf_counter()
+
+    if fmt == "pickle":
+        models = {}
+        for name, filename in ARTIFACTS["rf_gb"].items():
+            with open(os.path.join(models_dir, filename), "rb") as f:
+                models[name] = pickle.load(f)
+    else:
+        models = load_flat_artifacts(models_dir)
+
+    elapsed = time.perf_counter() - start
+
+    # Include whatever the first prediction pages in
+    X = np.zeros((1, len(FEATURE_COLS)), dtype=np.float32)
+    models["rf"].predict(X)
+    models["gb"].predict(X)
+
+    after = memory_kb()
+    print(json.dumps({
+        "load_s": elapsed,
+        "anon_mb": (after["RssAnon"] - before["RssAnon"]) / 1024,
+        "file_mb": (after["RssFile"] - before["RssFile"]) / 1024
+    }))
+
+
+def train(models_dir):
+    from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+    from sklearn.preprocessing import LabelEncoder
+
+    df = FeatureBuilder().transform(make_sales(N_ITEMS, N_DAYS))
+
+    encoders = {}
+    for col in ["weather", "exams", "region", "time_slot", "item"]:
+        encoders[col] = LabelEncoder()
+        df[col] = encoders[col].fit_transform(df[col])
+
+    X, y = df[FEATURE_COLS], df["quantity"]
+
+    rf = RandomForestRegressor(n_estimators=400, max_depth=15, min_samples_leaf=3, random_state=42, n_jobs=-1)
+    gb = GradientBoostingRegressor(n_estimators=300, learning_rate=0.05, max_depth=5, random_state=42)
+    rf.fit(X, y)
+    gb.fit(X, y)
+
+    for name, obj in [("rf_model.pkl", rf), ("gb_model.pkl", gb), ("encoders.pkl", encoders)]:
+        with open(os.path.join(models_dir, name), "wb") as f:
+            pickle.dump(obj, f)
+
+    save_flat_artifacts(models_dir, {"rf": rf, "gb": gb}, encoders)
+
+    flat = load_flat_artifacts(models_dir)
+    sample = X.sample(2000, random_state=0)
+    for name, model in [("rf", rf), ("gb", gb)]:
+        np.testing.assert_allclose(flat[name].predict(sample), model.predict(sample), rtol=1e-9, atol=1e-9)
+
+    return X
+
+
+def predict_latency(models_dir, X):
+    grid = X.sample(PREDICT_ROWS, replace=True, random_state=0)
+
+    models = {"flat": load_flat_artifacts(models_dir)}
+    models["pickle"] = {}
+    for name, filename in ARTIFACTS["rf_gb"].items():
+        with open(os.path.join(models_dir, filename), "rb") as f:
+            models["pickle"][name] = pickle.load(f)
+
+    print(f"{'format':>7} {'rf (s)':>7} {'gb (s)':>7}   ({PREDICT_ROWS} rows)")
+    for fmt, loaded in models.items():
+        times = []
+        for name in ["rf", "gb"]:
+            runs = []
+            for _ in range(REPEATS):
+                start = time.perf_counter()
+                loaded[name].predict(grid)
+                runs.append(time.perf_counter() - start)
+            times.append(min(runs))
+        print(f"{fmt:>7} {times[0]:>7.2f} {times[1]:>7.2f}")
+
+
+if __name__ == "__main__":
+
+    if len(sys.argv) == 4 and sys.argv[1] == "--load":
+        load_in_this_process(sys.argv[2], sys.argv[3])
+        sys.exit(0)
+
+    models_dir = tempfile.mkdtemp(prefix="cmdss_models_")
+    X = train(models_dir)
+    print("flat predictions match sklearn\n")
+
+    predict_latency(models_dir, X)
+    print()
+
+    print(f"{'format':>7} {'load (s)':>9} {'private MB':>11} {'shared MB':>10}")
+
+    for fmt in ["pickle", "flat"]:
+        runs = [
+            json.loads(subprocess.run(
+                [sys.executable, __file__, "--load", fmt, models_dir],
+                capture_output=True, text=True, check=True
+            ).stdout)
+            for _ in range(3)
+        ]
+        best = min(runs, key=lambda run: run["load_s"])
+        print(f"{fmt:>7} {best['load_s']:>9.3f} {best['anon_mb']:>11.1f} {best['file_mb']:>10.1f}")
+
+    print("\nprivate = anonymous RSS each worker pays; shared = file-backed pages served from the page cache")
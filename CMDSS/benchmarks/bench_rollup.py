@@ -0,0 +1,71 @@
+import os
+import time
+
+from pymongo import MongoClient
+
+from synthetic import make_sales
+from utils.db_handler import ensure_indexes
+from utils.rollup import rebuild_rollup
+
+# Needs a real mongod, like bench_indexes.py. Compares the dashboard's daily
+# totals and weather averages over raw sales with the same queries over
+# sales_daily_rollup.
+MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "cmdss_rollup_bench"
+
+OWNER = "owner_0"
+N_ITEMS = 200
+N_DAYS = 1095
+REPEATS = 5
+
+RAW_QUERIES = {
+    "daily totals": [
+        {"$match": {"owner_id": OWNER}},
+        {"$group": {"_id": "$date", "quantity": {"$sum": "$quantity"}}}
+    ],
+    "weather averages": [
+        {"$match": {"owner_id": OWNER}},
+        {"$group": {"_id": "$weather", "quantity": {"$avg": "$quantity"}}}
+    ]
+}
+
+ROLLUP_QUERIES = {
+    "daily totals": [
+        {"$match": {"owner_id": OWNER}},
+        {"$group": {"_id": "$date", "quantity": {"$sum": "$sum"}}}
+    ],
+    "weather averages": [
+        {"$match": {"owner_id": OWNER}},
+        {"$group": {"_id": "$weather", "sum": {"$sum": "$sum"}, "count": {"$sum": "$count"}}}
+    ]
+}
+
+
+def best_of(collection, pipeline):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        list(collection.aggregate(pipeline))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    db.sales.drop()
+    db.sales_daily_rollup.drop()
+    ensure_indexes(db)
+
+    db.sales.insert_many(make_sales(N_ITEMS, N_DAYS, owner_id=OWNER).to_dict("records"))
+
+    start = time.perf_counter()
+    written = rebuild_rollup(db, OWNER)
+    print(f"backfill: {db.sales.count_documents({})} rows -> {written} rollup documents "
+          f"in {time.perf_counter() - start:.2f}s\n")
+
+    for name in RAW_QUERIES:
+        raw = best_of(db.sales, RAW_QUERIES[name])
+        rollup = best_of(db.sales_daily_rollup, ROLLUP_QUERIES[name])
+        print(f"{name:>17}: raw {raw * 1000:7.1f} ms, rollup {rollup * 1000:7.1f} ms")
+
+    db.client.drop_database(DB_NAME)
@@ -0,0 +1,40 @@
+import itertools
+import time
+
+from bench_batch_inference import train_models
+from synthetic import make_sales, WEATHER, EXAMS, TIME_SLOTS
+from utils.inference import predict_demand, predict_scenarios
+
+ITEM_COUNTS = [50, 300]
+N_DAYS = 60
+
+
+def one_run_per_scenario(df, models):
+    # Picking each combination in the Tomorrow mode and pressing Predict
+    return [
+        predict_demand(df, {"weather": w, "exams": e, "region": "Urban", "time_slot": s}, models)
+        for w, e, s in itertools.product(WEATHER, EXAMS, TIME_SLOTS)
+    ]
+
+
+if __name__ == "__main__":
+
+    full = make_sales(max(ITEM_COUNTS), N_DAYS)
+    models = train_models(full)
+
+    n_scenarios = len(WEATHER) * len(EXAMS) * len(TIME_SLOTS)
+    print(f"{n_scenarios} scenarios\n")
+    print(f"{'items':>6} {'per scenario (s)':>17} {'grid (s)':>9} {'speedup':>8}")
+
+    for n_items in ITEM_COUNTS:
+        df = full[full["item"].isin(full["item"].unique()[:n_items])]
+
+        start = time.perf_counter()
+        one_run_per_scenario(df, models)
+        loop_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        predict_scenarios(df, "Urban", models, WEATHER, EXAMS, TIME_SLOTS)
+        grid_time = time.perf_counter() - start
+
+        print(f"{n_items:>6} {loop_time:>17.2f} {grid_time:>9.2f} {loop_time / grid_time:>7.1f}x")
@@ -0,0 +1,54 @@
+import os
+import tempfile
+import time
+
+import pandas as pd
+from pymongo import MongoClient
+
+from synthetic import make_sales
+import utils.snapshot as snapshot
+
+# Needs a real mongod, like bench_indexes.py: the point is BSON decoding and
+# network transfer, which mongomock does not have.
+MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "cmdss_snapshot_bench"
+
+OWNER = "owner_0"
+N_ITEMS = 200
+N_DAYS = 1095
+REPEATS = 5
+
+
+def best_of(run):
+    times = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        run()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+if __name__ == "__main__":
+    db = MongoClient(MONGO_URI)[DB_NAME]
+    db.sales.drop()
+    db.sales.insert_many(make_sales(N_ITEMS, N_DAYS, owner_id=OWNER).to_dict("records"))
+
+    snapshot.SNAPSHOT_DIR = tempfile.mkdtemp()
+
+    start = time.perf_counter()
+    rows = snapshot.refresh_snapshot(db, OWNER)
+    print(f"initial export of {rows} rows: {time.perf_counter() - start:.2f}s")
+
+    reads = {
+        "full history, mongo": lambda: pd.DataFrame(list(db.sales.find({"owner_id": OWNER}, {"_id": 0}))),
+        "full history, snapshot": lambda: snapshot.read_snapshot(OWNER),
+        "last 90 days, 2 columns, snapshot": lambda: snapshot.read_snapshot(
+            OWNER, ["item", "quantity"], start=pd.Timestamp("2024-10-01")
+        ),
+        "refresh with no new rows": lambda: snapshot.refresh_snapshot(db, OWNER)
+    }
+
+    for name, run in reads.items():
+        print(f"{name:>34}: {best_of(run) * 1000:8.1f} ms")
+
+    db.client.drop_database(DB_NAME)
@@ -0,0 +1,55 @@
+import os
+import time
+import tracemalloc
+
+import pandas as pd
+from pymongo import MongoClient
+
+from synthetic import make_sales
+from utils.features import FeatureBuilder
+from utils.training_data import stream_training_frame
+
+# Needs a real mongod, like bench_indexes.py: mongomock keeps the whole
+# collection in Python objects, which would swamp the measured peak.
+MONGO_URI = os.environ.get("BENCH_MONGO_URI", "mongodb://localhost:27017")
+DB_NAME = "cmdss_loader_bench"
+
+SIZES = [(100, 365), (300, 1095)]
+
+
+def list_loader(db):
+    # What train_model.py did before the streaming loader
+    df = pd.DataFrame(list(db.sales.find({}, {"_id": 0})))
+    return FeatureBuilder().transform(df)
+
+
+def measure(load, db):
+    tracemalloc.start()
+    start = time.perf_counter()
+    df = load(db)
+    seconds = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(df), seconds, peak / 2**20
+
+
+if __name__ == "__main__":
+    db = MongoClient(MONGO_URI)[DB_NAME]
+
+    loaders = {
+        "list": list_loader,
+        "stream": stream_training_frame,
+        "stream 25%": lambda db: stream_training_frame(db, sample=0.25)
+    }
+
+    print(f"{'rows':>9} {'loader':>11} {'seconds':>8} {'peak MiB':>9}")
+
+    for n_items, n_days in SIZES:
+        db.sales.drop()
+        db.sales.insert_many(make_sales(n_items, n_days).to_dict("records"))
+
+        for name, load in loaders.items():
+            rows, seconds, peak = measure(load, db)
+            print(f"{rows:>9} {name:>11} {seconds:>8.2f} {peak:>9.1f}")
+
+    db.client.drop_database(DB_NAME)
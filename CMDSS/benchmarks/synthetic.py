@@ -0,0 +1,41 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+WEATHER = ["Sunny", "Rainy", "Cloudy"]
+EXAMS = ["None", "Midterms", "Finals"]
+REGIONS = ["Urban", "Rural"]
+TIME_SLOTS = ["Morning", "Afternoon", "Evening", "Night"]
+
+
+def make_sales(n_items, n_days, owner_id="bench_owner", seed=42):
+    # One row per item per day, shaped like the documents data_entry.py writes
+    rng = np.random.default_rng(seed)
+
+    dates = pd.date_range("2022-01-01", periods=n_days, freq="D")
+    items = [f"item_{i:04d}" for i in range(n_items)]
+
+    day_weather = rng.choice(WEATHER, size=n_days)
+    day_exams = rng.choice(EXAMS, size=n_days, p=[0.7, 0.15, 0.15])
+
+    base = rng.integers(20, 200, size=n_items)
+
+    df = pd.DataFrame({
+        "owner_id": owner_id,
+        "item": np.repeat(items, n_days),
+        "date": np.tile(dates, n_items),
+        "weather": np.tile(day_weather, n_items),
+        "exams": np.tile(day_exams, n_items),
+        "region": rng.choice(REGIONS),
+        "time_slot": rng.choice(TIME_SLOTS, size=n_items * n_days)
+    })
+
+    noise = rng.normal(0, 10, size=len(df))
+    weekly = 15 * np.sin(2 * np.pi * df["date"].dt.weekday / 7)
+    df["quantity"] = np.maximum(0, np.repeat(base, n_days) + weekly + noise).astype(int)
+
+    return df
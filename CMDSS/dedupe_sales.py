@@ -0,0 +1,42 @@
+import argparse
+import streamlit as st
+from pymongo import MongoClient
+from utils.db_handler import bump_data_version, ensure_indexes
+from utils.rollup import rebuild_rollup
+from utils.sales_writer import merge_duplicate_sales
+
+# Merges sales rows that repeat (owner_id, date, item, time_slot), so the
+# unique index on that key can be built. Only rows saved before the index
+# existed can repeat; run once after deploying.
+
+def get_database():
+    client = MongoClient(st.secrets["MONGO_URI"])
+    return client[st.secrets["DB_NAME"]]
+
+def main(owners=None):
+    db = get_database()
+
+    removed = {}
+    for owner_id in owners or [None]:
+        removed.update(merge_duplicate_sales(db, owner_id))
+
+    for owner_id, rows in removed.items():
+        rebuild_rollup(db, owner_id)
+
+        # Rebuilt from sales on the owner's next write or Predictor visit
+        db.feature_state_owners.delete_one({"_id": owner_id})
+
+        bump_data_version(owner_id, db)
+
+        print(f"✔ {owner_id}: merged {rows} duplicate rows")
+
+    status = ensure_indexes(db)
+    print(f"sales.owner_date_item_slot: {'ok' if status['sales.owner_date_item_slot'] else 'missing'}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Merge duplicate sales rows and build the unique sales key index.")
+    parser.add_argument("--owner", action="append",
+                        help="only merge this owner's rows (repeatable)")
+    args = parser.parse_args()
+
+    main(args.owner)
@@ -1,7 +1,7 @@
 import streamlit as st
-import pandas as pd
 import plotly.express as px
-from utils.db_handler import fetch_sales_data
+from utils.db_handler import data_version
+from utils.dashboard_cache import dashboard_kpis, dashboard_distinct, dashboard_aggregate
 
 st.set_page_config(layout="wide")
 
@@ -11,29 +11,27 @@ if "owner_id" not in st.session_state:
     st.error("Please login first.")
     st.stop()
 
-df = fetch_sales_data(st.session_state["owner_id"])
+owner_id = st.session_state["owner_id"]
 
-if df.empty:
+# Queries below are cached per data version and read the daily rollup
+version = data_version(owner_id)
+
+kpis = dashboard_kpis(owner_id, version)
+
+if kpis is None:
     st.warning("No sales data available.")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-
 # ------------------ KPI SECTION ------------------
 
 st.markdown("## 📌 Key Metrics")
 
 col1, col2, col3, col4 = st.columns(4)
 
-total_sales = df["quantity"].sum()
-avg_sales = round(df["quantity"].mean(), 2)
-top_item = df.groupby("item")["quantity"].sum().idxmax()
-total_items = df["item"].nunique()
-
-col1.metric("📦 Total Units Sold", total_sales)
-col2.metric("📈 Avg Daily Demand", avg_sales)
-col3.metric("🏆 Top Performing Item", top_item)
-col4.metric("🍽 Total Menu Items", total_items)
+col1.metric("📦 Total Units Sold", kpis["total_sales"])
+col2.metric("📈 Avg Daily Demand", kpis["avg_sales"])
+col3.metric("🏆 Top Performing Item", kpis["top_item"])
+col4.metric("🍽 Total Menu Items", kpis["total_items"])
 
 st.markdown("---")
 
@@ -43,24 +41,24 @@ st.markdown("## 🎛 Filter Data")
 
 colf1, colf2 = st.columns(2)
 
+item_options = dashboard_distinct(owner_id, version, "item")
+weather_options = dashboard_distinct(owner_id, version, "weather")
+
 with colf1:
     selected_items = st.multiselect(
         "Select Items",
-        df["item"].unique(),
-        default=df["item"].unique()
+        item_options,
+        default=item_options
     )
 
 with colf2:
     selected_weather = st.multiselect(
         "Weather Condition",
-        df["weather"].unique(),
-        default=df["weather"].unique()
+        weather_options,
+        default=weather_options
     )
 
-filtered_df = df[
-    (df["item"].isin(selected_items)) &
-    (df["weather"].isin(selected_weather))
-]
+filters = {"items": selected_items, "weather": selected_weather}
 
 st.markdown("---")
 
@@ -71,7 +69,7 @@ st.markdown("## 📈 Demand Trends")
 view = st.radio("Select View", ["Time Series", "Item Comparison"], horizontal=True)
 
 if view == "Time Series":
-    daily = filtered_df.groupby("date")["quantity"].sum().reset_index()
+    daily = dashboard_aggregate(owner_id, version, "date", **filters)
 
     fig = px.line(
         daily,
@@ -85,7 +83,7 @@ if view == "Time Series":
     st.plotly_chart(fig, use_container_width=True)
 
 else:
-    item_summary = filtered_df.groupby("item")["quantity"].sum().reset_index()
+    item_summary = dashboard_aggregate(owner_id, version, "item", **filters)
 
     fig = px.bar(
         item_summary,
@@ -110,7 +108,7 @@ st.markdown("## 🧠 Context Insights")
 colc1, colc2 = st.columns(2)
 
 with colc1:
-    weather_avg = filtered_df.groupby("weather")["quantity"].mean().reset_index()
+    weather_avg = dashboard_aggregate(owner_id, version, "weather", stat="avg", **filters)
     fig_weather = px.bar(
         weather_avg,
         x="weather",
@@ -123,7 +121,7 @@ with colc1:
     st.plotly_chart(fig_weather, use_container_width=True)
 
 with colc2:
-    exam_avg = filtered_df.groupby("exams")["quantity"].mean().reset_index()
+    exam_avg = dashboard_aggregate(owner_id, version, "exams", stat="avg", **filters)
     fig_exam = px.bar(
         exam_avg,
         x="exams",
@@ -1,43 +1,41 @@
 import streamlit as st
 import pandas as pd
-import pickle
-import os
 import plotly.express as px
-from utils.db_handler import fetch_sales_data
+from utils.db_handler import data_version, get_db
+from utils.feature_store import ensure_feature_state, load_feature_history, sales_watermark
+from utils.encoding import UNKNOWN_CODE
+from utils.inference import FEATURE_COLS
+from utils.model_registry import get_models
+from utils.prediction_cache import cached_horizon, cached_predict_demand, cached_scenarios
+from utils.snapshot import read_snapshot, refresh_snapshot
 
 st.set_page_config(page_title="Demand Predictor", layout="wide")
 
+WEATHER = ["Sunny", "Rainy", "Cloudy"]
+EXAMS = ["None", "Midterms", "Finals"]
+REGIONS = ["Urban", "Rural"]
+TIME_SLOTS = ["Morning", "Afternoon", "Evening", "Night"]
+
 # ---------------- SESSION STATE ----------------
 
 if "predicted_df" not in st.session_state:
     st.session_state.predicted_df = None
 
-# ---------------- LOAD MODELS ----------------
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-MODEL_DIR = os.path.join(BASE_DIR, "..", "models")
-
-with open(os.path.join(MODEL_DIR, "rf_model.pkl"), "rb") as f:
-    rf = pickle.load(f)
-
-with open(os.path.join(MODEL_DIR, "gb_model.pkl"), "rb") as f:
-    gb = pickle.load(f)
-
-with open(os.path.join(MODEL_DIR, "encoders.pkl"), "rb") as f:
-    encoders = pickle.load(f)
-
-# ---------------- SAFE ENCODER ----------------
-
-def safe_encode(column, value):
-    if value in encoders[column].classes_:
-        return encoders[column].transform([value])[0]
-    return encoders[column].transform([encoders[column].classes_[0]])[0]
+if "horizon_df" not in st.session_state:
+    st.session_state.horizon_df = None
 
 # ---------------- LOAD DATA ----------------
 
-@st.cache_data
-def load_data(owner_id):
-    return fetch_sales_data(owner_id)
+# version is the owner's data_version marker in Mongo, so a saved sale from
+# any session or process loads fresh rows; TTL and max_entries bound memory
+# as more owners log in
+@st.cache_data(ttl=3600, max_entries=32, show_spinner=False)
+def load_data(owner_id, version):
+    refresh_snapshot(get_db(), owner_id)
+    return read_snapshot(
+        owner_id,
+        columns=["item", "weather", "exams", "time_slot", "quantity", "date"]
+    )
 
 st.title("🔮 Smart Next-Day Demand Forecast")
 
@@ -45,127 +43,191 @@ if "owner_id" not in st.session_state:
     st.error("Please login first.")
     st.stop()
 
-df = load_data(st.session_state["owner_id"])
+owner_id = st.session_state["owner_id"]
+
+# ---------------- LOAD MODELS ----------------
+
+# The owner's own partition when one has been trained, otherwise the global model
+models = get_models(owner_id)
 
-if df.empty:
+st.caption(f"Model: {models['backend']} · {models['partition']} · version {models['version']}")
+
+# Trailing window per item only; full history is loaded on demand for insights
+ensure_feature_state(owner_id)
+# Read before the history so cached forecasts are never keyed newer than
+# the rows they were computed from (see utils/prediction_cache.py)
+watermark = sales_watermark(owner_id)
+history = load_feature_history(owner_id)
+
+if history.empty:
     st.warning("No sales data available.")
     st.stop()
 
-df["date"] = pd.to_datetime(df["date"])
-df["exams"] = df["exams"].fillna("None")
-df = df.sort_values(["item", "date"])
+mode = st.radio("Forecast", ["Tomorrow", "What-if", "Multi-day"], horizontal=True)
 
-# ---------------- CONTEXT INPUT ----------------
+# ---------------- WHAT-IF MATRIX ----------------
 
-st.subheader("📌 Tomorrow Context")
+if mode == "What-if":
 
-col1, col2, col3, col4 = st.columns(4)
+    st.subheader("🧪 Tomorrow Under Every Scenario")
 
-with col1:
-    weather = st.selectbox("Weather", ["Sunny", "Rainy", "Cloudy"])
+    col1, col2, col3 = st.columns(3)
 
-with col2:
-    exams = st.selectbox("Exams", ["None", "Midterms", "Finals"])
+    with col1:
+        scenario_region = st.selectbox("Region", REGIONS, key="scenario_region")
 
-with col3:
-    region = st.selectbox("Region", ["Urban", "Rural"])
+    grid = cached_scenarios(owner_id, watermark, history, scenario_region, models, WEATHER, EXAMS, TIME_SLOTS)
 
-with col4:
-    time_slot = st.selectbox("Time Slot", ["Morning", "Afternoon", "Evening", "Night"])
+    with col2:
+        scenario_item = st.selectbox("Item", ["All items"] + sorted(grid["Item"].unique()))
 
-# ---------------- PREDICTION ----------------
+    with col3:
+        scenario_slot = st.selectbox("Time Slot", TIME_SLOTS, key="scenario_slot")
 
-if st.button("🚀 Predict Tomorrow Demand", use_container_width=True):
+    view = grid[grid["Time Slot"] == scenario_slot]
+    if scenario_item != "All items":
+        view = view[view["Item"] == scenario_item]
 
-    results = []
-    items = df["item"].unique()
+    matrix = view.pivot_table(
+        index="Weather", columns="Exams", values="Predicted Demand", aggfunc="sum"
+    ).reindex(index=WEATHER, columns=EXAMS)
 
-    last_date = df["date"].max()
-    next_date = last_date + pd.Timedelta(days=1)
+    fig = px.imshow(
+        matrix,
+        text_auto=True,
+        color_continuous_scale="Greens",
+        title=f"{scenario_item} · {scenario_slot}"
+    )
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("All scenarios"):
+        st.dataframe(grid, hide_index=True, use_container_width=True)
 
-    day_of_week = next_date.weekday()
-    week_of_year = int(next_date.isocalendar().week)
+    st.stop()
 
-    for item in items:
+# ---------------- MULTI-DAY HORIZON ----------------
 
-        item_data = df[df["item"] == item].sort_values("date")
-        quantities = item_data["quantity"].values
+if mode == "Multi-day":
 
-        lag_1 = quantities[-1] if len(quantities) >= 1 else 0
-        lag_2 = quantities[-2] if len(quantities) >= 2 else 0
-        lag_3 = quantities[-3] if len(quantities) >= 3 else 0
-        lag_7 = quantities[-7] if len(quantities) >= 7 else 0
+    st.subheader("📅 Forecast Calendar")
 
-        rolling_avg_3 = item_data["quantity"].tail(3).mean()
-        rolling_avg_7 = item_data["quantity"].tail(7).mean()
-        rolling_std_7 = item_data["quantity"].tail(7).std()
+    col1, col2 = st.columns(2)
 
-        rolling_std_7 = 0 if pd.isna(rolling_std_7) else rolling_std_7
+    with col1:
+        days = st.slider("Days ahead", 1, 14, 7)
 
-        input_data = {
-            "weather": safe_encode("weather", weather),
-            "exams": safe_encode("exams", exams),
-            "region": safe_encode("region", region),
-            "time_slot": safe_encode("time_slot", time_slot),
-            "day_of_week": day_of_week,
-            "week_of_year": week_of_year,
-            "item": safe_encode("item", item),
-            "lag_1": lag_1,
-            "lag_2": lag_2,
-            "lag_3": lag_3,
-            "lag_7": lag_7,
-            "rolling_avg_3": rolling_avg_3,
-            "rolling_avg_7": rolling_avg_7,
-            "rolling_std_7": rolling_std_7
-        }
+    with col2:
+        horizon_region = st.selectbox("Region", REGIONS, key="horizon_region")
 
-        feature_order = list(input_data.keys())
-        input_df = pd.DataFrame([input_data])[feature_order]
+    first_day = history["date"].max() + pd.Timedelta(days=1)
 
-        rf_pred = rf.predict(input_df)[0]
-        gb_pred = gb.predict(input_df)[0]
+    calendar = st.data_editor(
+        pd.DataFrame({
+            "date": pd.date_range(first_day, periods=days, freq="D"),
+            "weather": WEATHER[0],
+            "exams": EXAMS[0]
+        }),
+        column_config={
+            "date": st.column_config.DateColumn("Date", disabled=True),
+            "weather": st.column_config.SelectboxColumn("Weather", options=WEATHER, required=True),
+            "exams": st.column_config.SelectboxColumn("Exams", options=EXAMS, required=True)
+        },
+        hide_index=True,
+        use_container_width=True
+    )
 
-        predicted = max(0, round((rf_pred + gb_pred) / 2))
+    if st.button(f"🚀 Forecast {days} Days", use_container_width=True):
+        st.session_state.horizon_df = cached_horizon(
+            owner_id, watermark, history, calendar.to_dict("records"), horizon_region, TIME_SLOTS, models
+        )
 
-        # -------- Demand Level --------
+    horizon_df = st.session_state.horizon_df
 
-        if predicted < 80:
-            level = "🔵 LOW"
-            recommendation = "⚠ Reduce Preparation"
-        elif predicted < 150:
-            level = "🟡 MEDIUM"
-            recommendation = "✅ Maintain Stock"
-        else:
-            level = "🔴 HIGH"
-            recommendation = "🔥 Increase Preparation"
+    if horizon_df is None:
+        st.stop()
 
-        # -------- Trend --------
+    st.markdown("## 📦 Procurement Summary")
 
-        if len(item_data) >= 6:
-            recent_avg = item_data["quantity"].tail(3).mean()
-            previous_avg = item_data["quantity"].iloc[-6:-3].mean()
+    daily_total = horizon_df.groupby("Date", as_index=False)["Predicted Demand"].sum()
 
-            if recent_avg > previous_avg:
-                trend = "📈 Increasing"
-            elif recent_avg < previous_avg:
-                trend = "📉 Decreasing"
-            else:
-                trend = "➖ Stable"
-        else:
-            trend = "➖ Stable"
-
-        results.append({
-            "Item": item,
-            "Predicted Demand": predicted,
-            "Demand Level": level,
-            "Trend": trend,
-            "Recommendation": recommendation
-        })
-
-    st.session_state.predicted_df = (
-        pd.DataFrame(results)
-        .sort_values("Predicted Demand", ascending=False)
+    fig = px.bar(
+        daily_total,
+        x="Date",
+        y="Predicted Demand",
+        text="Predicted Demand",
+        title="Total Demand per Day"
     )
+    fig.update_traces(textposition="outside")
+    fig.update_layout(template="plotly")
+    st.plotly_chart(fig, use_container_width=True)
+
+    per_item = horizon_df.pivot_table(
+        index="Item", columns="Date", values="Predicted Demand", aggfunc="sum"
+    )
+    per_item.columns = [date.strftime("%a %d %b") for date in per_item.columns]
+    per_item["Total"] = per_item.sum(axis=1)
+
+    st.dataframe(per_item.sort_values("Total", ascending=False), use_container_width=True)
+
+    with st.expander("Per time slot"):
+        st.dataframe(horizon_df, hide_index=True, use_container_width=True)
+
+    st.stop()
+
+# ---------------- CONTEXT INPUT ----------------
+
+st.subheader("📌 Tomorrow Context")
+
+col1, col2, col3, col4 = st.columns(4)
+
+with col1:
+    weather = st.selectbox("Weather", WEATHER)
+
+with col2:
+    exams = st.selectbox("Exams", EXAMS)
+
+with col3:
+    region = st.selectbox("Region", REGIONS)
+
+with col4:
+    time_slot = st.selectbox("Time Slot", TIME_SLOTS)
+
+# ---------------- PREDICTION ----------------
+
+if st.button("🚀 Predict Tomorrow Demand", use_container_width=True):
+
+    context = {
+        "weather": weather,
+        "exams": exams,
+        "region": region,
+        "time_slot": time_slot
+    }
+
+    # Values the model never saw are encoded as unknown; say how the backend
+    # predicts them (see utils/encoding.py)
+    def predicted_as(col):
+        if models["backend"] == "hist":
+            categorical = models["hgb"].is_categorical_
+            if categorical is not None and categorical[FEATURE_COLS.index(col)]:
+                return "treated as missing"
+        return f"predicted like '{models['encoder'].tables[col][0]}'"
+
+    unseen = [
+        f"{col.replace('_', ' ')} '{value}' ({predicted_as(col)})"
+        for col, value in context.items()
+        if models["encoder"].encode_value(col, value) == UNKNOWN_CODE
+    ]
+    new_items = models["encoder"].unknown("item", history["item"])
+
+    if unseen:
+        st.info(f"Not seen in training: {', '.join(unseen)}")
+    if new_items:
+        st.info(
+            f"{len(new_items)} item(s) are newer than the model and {predicted_as('item')}; "
+            f"their forecasts are rough until the next retrain."
+        )
+
+    st.session_state.predicted_df = cached_predict_demand(owner_id, watermark, history, context, models)
 
 # ---------------- DISPLAY RESULTS ----------------
 
@@ -232,6 +294,11 @@ if st.session_state.predicted_df is not None:
     st.markdown("---")
     st.markdown("## 🧠 Data-Driven Insights")
 
+    if not st.toggle("Show insights from full sales history"):
+        st.stop()
+
+    df = load_data(owner_id, data_version(owner_id))
+
     for _, row in filtered_df.iterrows():
 
         item = row["Item"]
@@ -242,20 +309,20 @@ if st.session_state.predicted_df is not None:
         reasons = []
 
         # Weather effect
-        avg_weather = item_df.groupby("weather")["quantity"].mean()
+        avg_weather = item_df.groupby("weather", observed=True)["quantity"].mean()
         if not avg_weather.empty:
             top_weather = avg_weather.idxmax()
             reasons.append(f"🌦 Performs best during **{top_weather}** conditions")
 
         # Exam effect
-        avg_exam = item_df.groupby("exams")["quantity"].mean()
+        avg_exam = item_df.groupby("exams", observed=True)["quantity"].mean()
         if not avg_exam.empty:
             top_exam = avg_exam.idxmax()
             if top_exam != "None":
                 reasons.append(f"📚 Demand increases during **{top_exam}** period")
 
         # Time slot effect
-        avg_slot = item_df.groupby("time_slot")["quantity"].mean()
+        avg_slot = item_df.groupby("time_slot", observed=True)["quantity"].mean()
         if not avg_slot.empty:
             top_slot = avg_slot.idxmax()
             reasons.append(f"⏰ Highest sales during **{top_slot}** time slot")
@@ -1,6 +1,7 @@
 import streamlit as st
 import pandas as pd
-from utils.db_handler import get_db
+from utils.db_handler import get_db, index_status
+from utils.result_cache import cache_stats
 
 st.title("👑 Admin Panel")
 
@@ -22,6 +23,29 @@ col2.metric("Total Sales Records", total_sales)
 
 st.markdown("---")
 
+# -------- Database Indexes --------
+st.subheader("🗂 Database Indexes")
+
+for name, exists in index_status(db).items():
+    if exists:
+        st.success(f"{name} ✅")
+    else:
+        st.error(f"{name} missing ❌")
+
+st.markdown("---")
+
+# -------- Caches --------
+st.subheader("⚡ Query Caches")
+
+# Caches register on first use in this process
+stats = cache_stats()
+if stats:
+    st.dataframe(pd.DataFrame(stats), hide_index=True, use_container_width=True)
+else:
+    st.info("No caches in use yet")
+
+st.markdown("---")
+
 # -------- Pending Approvals --------
 st.subheader("⏳ Pending User Approvals")
 
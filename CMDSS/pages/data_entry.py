@@ -1,7 +1,9 @@
 import streamlit as st
 import pandas as pd
 from datetime import datetime
-from utils.db_handler import get_db
+from utils.ingest import missing_columns
+from utils.ingest_jobs import ACTIVE_STATUSES, submit_ingest_job, get_ingest_job
+from utils.sales_writer import save_sales_records
 
 st.title("📥 Data Management")
 
@@ -9,8 +11,6 @@ if "owner_id" not in st.session_state:
     st.error("Please login first")
     st.stop()
 
-db = get_db()
-
 st.markdown("---")
 
 mode = st.radio(
@@ -32,30 +32,73 @@ if mode == "📂 Upload Historical CSV":
 
     if uploaded_file is not None:
 
-        df = pd.read_csv(uploaded_file)
-
-        required_columns = [
-            "item", "quantity", "weather",
-            "exams", "region", "time_slot", "date"
-        ]
+        # Only the first rows are parsed here; the full file is streamed on upload
+        preview_df = pd.read_csv(uploaded_file, nrows=5)
 
-        if not all(col in df.columns for col in required_columns):
+        if missing_columns(preview_df.columns):
             st.error("❌ CSV format incorrect. Missing required columns.")
             st.stop()
 
         st.success("✅ File validated successfully!")
 
-        st.dataframe(df.head(), use_container_width=True)
+        st.dataframe(preview_df, use_container_width=True)
 
         if st.button("🚀 Upload to Database"):
+            st.session_state.ingest_job_id = submit_ingest_job(
+                st.session_state["owner_id"],
+                uploaded_file
+            )
+
+    # ---------------- Upload Progress ----------------
+    def show_ingest_job(job_id, polling):
+        job = get_ingest_job(job_id)
+
+        if job is None:
+            return
+
+        if job["status"] in ACTIVE_STATUSES:
+            st.progress(
+                job["progress"],
+                text=f"Uploading {job['filename']}... {job['rows']} rows read"
+            )
+
+        elif polling:
+            # Job just finished, rerun once to stop polling
+            st.rerun()
+
+        elif job["status"] == "done":
+            stats = job["stats"]
+
+            st.success(
+                f"🎉 {stats['inserted']} records uploaded successfully! "
+                f"({stats['rows_per_second']:,.0f} rows/sec)"
+            )
+
+            if stats["rejected"]:
+                st.warning(f"{stats['rejected']} rows had invalid values and were skipped.")
 
-            df["owner_id"] = st.session_state["owner_id"]
-            df["date"] = pd.to_datetime(df["date"])
+            if stats.get("merged"):
+                st.info(
+                    f"{stats['merged']} rows shared a date, item and time slot with "
+                    f"another row of the file and were added to it."
+                )
 
-            records = df.to_dict("records")
-            db.sales.insert_many(records)
+            if stats.get("conflicts"):
+                st.warning(
+                    f"{stats['conflicts']} rows were not imported: a sale for the same "
+                    f"date, item and time slot is already stored."
+                )
 
-            st.success(f"🎉 {len(records)} records uploaded successfully!")
+        else:
+            st.error(f"❌ Upload failed: {job.get('error', 'unknown error')}")
+
+    if st.session_state.get("ingest_job_id"):
+        job = get_ingest_job(st.session_state.ingest_job_id)
+        polling = job is not None and job["status"] in ACTIVE_STATUSES
+
+        st.fragment(show_ingest_job, run_every=2 if polling else None)(
+            st.session_state.ingest_job_id, polling
+        )
 
 # ======================================================
 # MODE 2 — DAILY JOURNAL ENTRY
@@ -106,12 +149,25 @@ else:
             if not item.strip():
                 st.warning("Item name cannot be empty")
             else:
-                st.session_state.daily_items.append({
-                    "item": item,
-                    "quantity": quantity,
-                    "time_slot": time_slot
-                })
-                st.success(f"{item} added successfully!")
+                # One row per item and time slot, as stored in the database
+                existing = next(
+                    (
+                        entry for entry in st.session_state.daily_items
+                        if entry["item"] == item and entry["time_slot"] == time_slot
+                    ),
+                    None
+                )
+
+                if existing is not None:
+                    existing["quantity"] += quantity
+                    st.success(f"{item} ({time_slot}) updated to {existing['quantity']}!")
+                else:
+                    st.session_state.daily_items.append({
+                        "item": item,
+                        "quantity": quantity,
+                        "time_slot": time_slot
+                    })
+                    st.success(f"{item} added successfully!")
 
     # ---------------- Show Added Items ----------------
     if st.session_state.daily_items:
@@ -125,8 +181,8 @@ else:
 
         if st.button("✅ End Day & Save to Database"):
 
-            for entry in st.session_state.daily_items:
-                db.sales.insert_one({
+            records = [
+                {
                     "owner_id": st.session_state["owner_id"],
                     "item": entry["item"],
                     "quantity": int(entry["quantity"]),
@@ -135,9 +191,17 @@ else:
                     "region": region,
                     "time_slot": entry["time_slot"],
                     "date": datetime.combine(date, datetime.min.time())
-                })
+                }
+                for entry in st.session_state.daily_items
+            ]
+
+            saved = save_sales_records(st.session_state["owner_id"], records)
+            skipped = len(records) - saved
+
+            st.success(f"🎉 {saved} items saved successfully!")
 
-            st.success("🎉 All items saved successfully!")
+            if skipped:
+                st.info(f"{skipped} items were already saved for this day and time slot.")
 
             # Clear session state
             st.session_state.daily_items = []
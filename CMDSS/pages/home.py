@@ -1,5 +1,6 @@
 import streamlit as st
-from utils.db_handler import get_db, fetch_sales_data
+from pymongo.errors import DuplicateKeyError
+from utils.db_handler import get_db, has_sales_data
 
 
 st.title("Smart Canteen Management Decision Support System")
@@ -59,9 +60,7 @@ db = get_db()
 # ---------------- CHECK IF LOGGED IN ----------------
 if "owner_id" in st.session_state:
 
-    df = fetch_sales_data(st.session_state["owner_id"])
-
-    if df.empty:
+    if not has_sales_data(st.session_state["owner_id"]):
         st.info("""
         👋 Welcome! To start using CMDSS:
         
@@ -127,14 +126,16 @@ if "owner_id" not in st.session_state:
                     if existing_user:
                         st.error("Username already exists.")
                     else:
-                        db.users.insert_one({
-                            "username": username,
-                            "password": password,
-                            "role": "owner",
-                            "approved": False
-                        })
-
-                        st.success("Registration successful! Awaiting admin approval.")
+                        try:
+                            db.users.insert_one({
+                                "username": username,
+                                "password": password,
+                                "role": "owner",
+                                "approved": False
+                            })
+                            st.success("Registration successful! Awaiting admin approval.")
+                        except DuplicateKeyError:
+                            st.error("Username already exists.")
 
 # ---------------- LOGGED IN VIEW ----------------
 else:
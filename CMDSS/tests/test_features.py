@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.features import FeatureBuilder, HISTORY_FEATURES
+
+COLUMNS = ["day_of_week", "week_of_year"] + HISTORY_FEATURES
+
+TIME_SLOTS = ["Morning", "Afternoon", "Evening", "Night"]
+
+
+def make_sales(n_items, n_days, slots_per_day=1, seed=42):
+    # One row per item, day and time slot, in the order the journal saves them
+    rng = np.random.default_rng(seed)
+
+    rows = pd.MultiIndex.from_product(
+        [
+            [f"item_{i:02d}" for i in range(n_items)],
+            pd.date_range("2024-01-01", periods=n_days, freq="D"),
+            TIME_SLOTS[:slots_per_day]
+        ],
+        names=["item", "date", "time_slot"]
+    ).to_frame(index=False)
+
+    rows["quantity"] = rng.integers(0, 200, size=len(rows))
+    return rows
+
+
+def serve_and_train_rows(df):
+    builder = FeatureBuilder()
+
+    last_date = df["date"].max()
+    history = df[df["date"] < last_date]
+
+    train_rows = builder.transform(df)
+    # Serving builds one row per item from the rows before it; with several
+    # slots a day that is the item's first row on the new date
+    train_rows = (
+        train_rows[train_rows["date"] == last_date]
+        .groupby("item", sort=False).head(1)
+        .set_index("item")
+    )
+
+    serve_rows = builder.next_step(history, last_date)
+    return train_rows, serve_rows
+
+
+@pytest.mark.parametrize("n_days, slots_per_day", [(30, 1), (5, 1), (30, 3), (3, 4)])
+def test_serving_features_match_training(n_days, slots_per_day):
+    df = make_sales(12, n_days, slots_per_day)
+
+    train_rows, serve_rows = serve_and_train_rows(df)
+
+    pd.testing.assert_frame_equal(
+        train_rows[COLUMNS].sort_index().astype(float),
+        serve_rows[COLUMNS].sort_index().astype(float)
+    )
+
+
+def test_serving_ignores_rows_beyond_the_window():
+    df = make_sales(5, 40, slots_per_day=2)
+    last_date = df["date"].max()
+    history = df[df["date"] < last_date]
+
+    builder = FeatureBuilder()
+    trailing = history.groupby("item").tail(builder.window)
+
+    pd.testing.assert_frame_equal(
+        builder.next_step(history, last_date),
+        builder.next_step(trailing, last_date)
+    )
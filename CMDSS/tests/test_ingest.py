@@ -0,0 +1,97 @@
+import io
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import utils.db_handler as db_handler
+import utils.feature_store as feature_store
+import utils.rollup as rollup
+import utils.sales_writer as sales_writer
+from utils.ingest import coerce_chunk, ingest_csv
+
+HEADER = "item,quantity,weather,exams,region,time_slot,date\n"
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().cmdss
+    db_handler.ensure_indexes(db)
+
+    for module in (db_handler, feature_store, rollup, sales_writer):
+        monkeypatch.setattr(module, "get_db", lambda: db)
+
+    # mongomock has no $topN
+    def fetch_recent_sales(owner_id, per_item=7):
+        rows = pd.DataFrame(
+            list(db.sales.find({"owner_id": owner_id}, {"_id": 0, "item": 1, "date": 1, "quantity": 1})),
+            columns=["item", "date", "quantity"]
+        )
+        return rows.sort_values(["item", "date"]).groupby("item").tail(per_item)
+
+    monkeypatch.setattr(feature_store, "fetch_recent_sales", fetch_recent_sales)
+    return db
+
+
+def csv_file(rows):
+    return io.BytesIO((HEADER + "".join(row + "\n" for row in rows)).encode())
+
+
+def stored(db):
+    return {
+        (doc["date"].strftime("%m-%d"), doc["item"], doc["time_slot"]): doc["quantity"]
+        for doc in db.sales.find()
+    }
+
+
+def test_coerce_chunk_sums_rows_sharing_a_key():
+    chunk = pd.read_csv(csv_file([
+        "Tea,10,Sunny,,Urban,Morning,2024-01-02",
+        "Tea,5,Sunny,,Rural,Morning,2024-01-02",
+        "Tea,x,Sunny,,Urban,Morning,2024-01-02",
+        "Tea,7,Sunny,,Urban,Night,2024-01-02"
+    ]))
+
+    records, rejected, merged = coerce_chunk(chunk, "owner")
+
+    assert (rejected, merged) == (1, 1)
+    assert [(r["time_slot"], r["quantity"], r["region"]) for r in records] == [
+        ("Morning", 15, "Urban"), ("Night", 7, "Urban")
+    ]
+
+
+@pytest.mark.parametrize("chunk_rows", [1, 2, 3, 100])
+def test_repeats_add_up_whatever_the_chunk_size(db, chunk_rows):
+    rows = [
+        "Tea,5,Sunny,,Urban,Morning,2024-01-02",
+        "Coffee,3,Sunny,,Urban,Morning,2024-01-02",
+        "Tea,7,Sunny,,Rural,Morning,2024-01-02",
+        "Tea,2,Sunny,,Urban,Night,2024-01-02",
+        "Tea,1,Sunny,,Urban,Morning,2024-01-02"
+    ]
+
+    stats = ingest_csv(csv_file(rows), "owner", chunk_rows=chunk_rows)
+
+    assert stored(db) == {
+        ("01-02", "Tea", "Morning"): 13,
+        ("01-02", "Coffee", "Morning"): 3,
+        ("01-02", "Tea", "Night"): 2
+    }
+    assert (stats["inserted"], stats["merged"], stats["conflicts"]) == (3, 2, 0)
+
+    rollup_total = sum(doc["sum"] for doc in db.sales_daily_rollup.find())
+    state_total = sum(doc["sum"] for doc in db.feature_state.find())
+    assert rollup_total == state_total == 18
+
+
+def test_rows_stored_before_the_upload_are_conflicts(db):
+    ingest_csv(csv_file(["Tea,5,Sunny,,Urban,Morning,2024-01-02"]), "owner")
+
+    stats = ingest_csv(csv_file([
+        "Tea,7,Sunny,,Urban,Morning,2024-01-02",
+        "Tea,1,Sunny,,Urban,Morning,2024-01-02"
+    ]), "owner", chunk_rows=1)
+
+    assert stored(db) == {("01-02", "Tea", "Morning"): 5}
+    assert (stats["inserted"], stats["conflicts"]) == (0, 2)
@@ -0,0 +1,71 @@
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import utils.db_handler as db_handler
+import utils.feature_store as feature_store
+import utils.rollup as rollup
+import utils.sales_writer as sales_writer
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().cmdss
+    db_handler.ensure_indexes(db)
+
+    for module in (db_handler, feature_store, rollup, sales_writer):
+        monkeypatch.setattr(module, "get_db", lambda: db)
+
+    # mongomock has no $topN
+    def fetch_recent_sales(owner_id, per_item=7):
+        rows = pd.DataFrame(
+            list(db.sales.find({"owner_id": owner_id}, {"_id": 0, "item": 1, "date": 1, "quantity": 1})),
+            columns=["item", "date", "quantity"]
+        )
+        return rows.sort_values(["item", "date"]).groupby("item").tail(per_item)
+
+    monkeypatch.setattr(feature_store, "fetch_recent_sales", fetch_recent_sales)
+    return db
+
+
+def sale(day, quantity):
+    return {
+        "owner_id": "owner", "item": "Tea", "quantity": quantity, "weather": "Sunny",
+        "exams": "None", "region": "Urban", "time_slot": "Morning", "date": datetime(2024, 1, day)
+    }
+
+
+def failing(*args):
+    raise RuntimeError("derived update failed")
+
+
+def totals(db):
+    return (
+        sum(doc["sum"] for doc in db.sales_daily_rollup.find()),
+        sum(doc["sum"] for doc in db.feature_state.find())
+    )
+
+
+def test_a_failed_update_falls_back_to_a_rebuild(db, monkeypatch):
+    sales_writer.save_sales_records("owner", [sale(1, 5)])
+    monkeypatch.setattr(sales_writer, "update_feature_state", failing)
+
+    assert sales_writer.save_sales_records("owner", [sale(2, 7)]) == 1
+    assert totals(db) == (12, 12)
+    assert db_handler.data_version("owner") == 2
+
+
+def test_the_version_is_bumped_when_a_rebuild_fails_too(db, monkeypatch):
+    sales_writer.save_sales_records("owner", [sale(1, 5)])
+    monkeypatch.setattr(sales_writer, "update_rollup", failing)
+    monkeypatch.setattr(sales_writer, "rebuild_rollup", failing)
+
+    with pytest.raises(RuntimeError):
+        sales_writer.save_sales_records("owner", [sale(2, 7)])
+
+    # The feature state is still updated and caches are invalidated
+    assert totals(db) == (5, 12)
+    assert db_handler.data_version("owner") == 2
@@ -0,0 +1,46 @@
+import os
+from datetime import datetime, timedelta
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import utils.snapshot as snapshot
+
+
+@pytest.fixture
+def db(monkeypatch, tmp_path):
+    db = mongomock.MongoClient().cmdss
+    monkeypatch.setattr(snapshot, "get_db", lambda: db)
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    return db
+
+
+def insert_days(db, first, days):
+    db.sales.insert_many([
+        {
+            "owner_id": "owner", "item": "Tea", "quantity": day, "weather": "Sunny",
+            "exams": "None", "region": "Urban", "time_slot": "Morning",
+            "date": datetime(2024, 1, 1) + timedelta(days=day)
+        }
+        for day in range(first, first + days)
+    ])
+
+
+def test_a_missing_part_is_rebuilt_on_read(db):
+    insert_days(db, 0, 10)
+    snapshot.refresh_snapshot(db, "owner")
+    insert_days(db, 10, 5)
+    snapshot.refresh_snapshot(db, "owner")
+
+    path = snapshot.snapshot_dir("owner")
+    parts = snapshot._read_manifest(path)["parts"]
+    assert len(parts) == 2
+    os.remove(os.path.join(path, parts[0]))
+
+    # The row count still matches, but the refresh must not trust it
+    assert snapshot.refresh_snapshot(db, "owner") == 15
+    assert sorted(snapshot.read_snapshot("owner")["quantity"]) == list(range(15))
+
+    os.remove(os.path.join(path, snapshot._read_manifest(path)["parts"][0]))
+    assert sorted(snapshot.read_snapshot("owner")["quantity"]) == list(range(15))
@@ -0,0 +1,96 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+
+import utils.snapshot as snapshot
+import utils.training_data as training_data
+from utils.features import HISTORY_FEATURES
+from utils.training_data import snapshot_training_frame, stream_training_frame
+
+START = datetime(2024, 3, 1)
+
+
+@pytest.fixture
+def db(monkeypatch):
+    db = mongomock.MongoClient().cmdss
+
+    # mongomock has no $topN
+    def lookback_docs(db, query, start):
+        docs = db.sales.find({**query, "date": {"$lt": start}}, {"_id": 0})
+        rows = pd.DataFrame(list(docs)).sort_values(["item", "date"])
+        return rows.groupby("item").tail(training_data.LOOKBACK_ROWS).to_dict("records")
+
+    monkeypatch.setattr(training_data, "_lookback_docs", lookback_docs)
+    return db
+
+
+def sales(item, days, step):
+    rng = np.random.default_rng(len(item))
+    first = START - timedelta(days=days)
+    return [
+        {
+            "owner_id": "owner", "item": item, "quantity": int(rng.integers(1, 50)),
+            "weather": "Sunny", "exams": "None", "region": "Urban", "time_slot": "Morning",
+            "date": first + timedelta(days=day)
+        }
+        for day in range(0, 2 * days, step)
+    ]
+
+
+def feature_rows(df):
+    df = df[df["date"] >= START]
+    return (
+        df[["item", "date"] + HISTORY_FEATURES]
+        .astype({"item": str})
+        .sort_values(["item", "date"])
+        .reset_index(drop=True)
+    )
+
+
+def test_window_start_keeps_the_lags_of_sparse_items(db):
+    # Weekly sales put an item's last 7 rows seven weeks before start
+    db.sales.insert_many(sales("Cake", 70, 7) + sales("Tea", 30, 1))
+
+    full = stream_training_frame(db, batch_rows=8)
+    windowed = stream_training_frame(db, start=START, batch_rows=8)
+
+    pd.testing.assert_frame_equal(feature_rows(windowed), feature_rows(full))
+    assert (windowed["date"] >= START).all()
+    assert feature_rows(windowed)["lag_7"].gt(0).all()
+
+
+def test_backfilled_rows_get_the_features_of_a_full_run(db):
+    # Incremental training loads from the oldest new row, which may be a
+    # backfilled day in the middle of an item's history
+    db.sales.insert_many(sales("Cake", 70, 7) + sales("Tea", 30, 1))
+    backfill = sales("Cake", 70, 1)[3::7]
+    db.sales.insert_many(backfill)
+
+    oldest = min(doc["date"] for doc in backfill)
+    full = stream_training_frame(db)
+    windowed = stream_training_frame(db, start=oldest)
+
+    keys = full["date"] >= oldest
+    pd.testing.assert_frame_equal(
+        windowed[["item", "date"] + HISTORY_FEATURES].astype({"item": str}).reset_index(drop=True),
+        full.loc[keys, ["item", "date"] + HISTORY_FEATURES].astype({"item": str}).reset_index(drop=True)
+    )
+
+
+@pytest.mark.parametrize("range_rows", [1, 40, 10 ** 6])
+def test_snapshot_frame_matches_the_mongo_frame(db, monkeypatch, tmp_path, range_rows):
+    monkeypatch.setattr(snapshot, "SNAPSHOT_DIR", str(tmp_path))
+    db.sales.insert_many(sales("Cake", 70, 7) + sales("Tea", 30, 1) + sales("Bun", 20, 2))
+    db.sales.insert_many([{**doc, "owner_id": "other"} for doc in sales("Tea", 10, 1)])
+    for owner_id in ("owner", "other"):
+        snapshot.refresh_snapshot(db, owner_id)
+
+    expected = stream_training_frame(db, start=START)
+    frame = snapshot_training_frame(["owner", "other"], start=START, batch_rows=8, range_rows=range_rows)
+
+    pd.testing.assert_frame_equal(feature_rows(frame), feature_rows(expected))
+    assert list(frame["weather"].cat.categories) == ["Sunny"]
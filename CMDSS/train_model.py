@@ -1,127 +1,313 @@
+import argparse
 import pandas as pd
 import pickle
 import os
 import streamlit as st
 from pymongo import MongoClient
-from sklearn.ensemble import RandomForestRegressor, GradientBoostingRegressor
+from bson import ObjectId
+import time
+from datetime import datetime
 from sklearn.preprocessing import LabelEncoder
-from sklearn.model_selection import TimeSeriesSplit
-from sklearn.metrics import r2_score, mean_absolute_error
 import numpy as np
+from utils.inference import FEATURE_COLS, CATEGORICAL_COLS
+from utils.model_format import save_flat_artifacts
+from utils.model_registry import (
+    ARTIFACTS, DEFAULT_BACKEND, MODEL_DIR,
+    partition_dir, read_training_info, write_training_info, write_backend
+)
+from utils.training import BACKENDS, cross_validate, extend_models, fit_final
+from utils.snapshot import refresh_snapshot
+from utils.training_data import snapshot_training_frame, stream_training_frame
+
+# Owners with less history than this keep using the global model
+MIN_PARTITION_ROWS = 500
+
+# "snapshot" reads local Parquet copies of the sales (utils/snapshot.py),
+# refreshed incrementally; "mongo" streams straight from the collection
+SOURCE = "snapshot"
+
+# Incremental runs fall back to a full retrain once the last one is this old
+FULL_RETRAIN_DAYS = 7
 
 # ------------------ DATABASE ------------------
 
-MONGO_URI = st.secrets["MONGO_URI"]
-DB_NAME = st.secrets["DB_NAME"]
+def get_database():
+    client = MongoClient(st.secrets["MONGO_URI"])
+    return client[st.secrets["DB_NAME"]]
 
-client = MongoClient(MONGO_URI)
-db = client[DB_NAME]
+def load_sales(query=None, start=None, sample=None):
+    # Features come already built, see utils/training_data.py
+    db = get_database()
+
+    if SOURCE == "mongo":
+        return stream_training_frame(db, query, start=start, sample=sample)
+
+    owners = [query["owner_id"]] if query else db.sales.distinct("owner_id")
+    for owner_id in owners:
+        refresh_snapshot(db, owner_id)
+    return snapshot_training_frame(owners, start=start, sample=sample)
+
+def latest_sale_id(query=None):
+    # Rows with a higher _id are new to models trained now
+    doc = get_database().sales.find_one(query or {}, {"_id": 1}, sort=[("_id", -1)])
+    return None if doc is None else str(doc["_id"])
+
+# Identifies a sale within one owner (utils/sales_writer.py)
+NEW_ROW_KEY = ["date", "item", "time_slot"]
+
+def _row_keys(df):
+    return pd.MultiIndex.from_arrays([
+        pd.to_datetime(df["date"]), df["item"].astype(str), df["time_slot"].astype(str)
+    ])
+
+def sales_watermarks():
+    # Row count and latest date per owner; any new upload changes one of them
+    db = get_database()
+    pipeline = [
+        {"$group": {
+            "_id": "$owner_id",
+            "count": {"$sum": 1},
+            "last_date": {"$max": "$date"}
+        }}
+    ]
+    return {
+        row["_id"]: {"count": row["count"], "last_date": str(row["last_date"])}
+        for row in db.sales.aggregate(pipeline)
+    }
+
+# ------------------ SAVING ------------------
+
+# Write to a temp file and rename so a running app never loads a half-written artifact
+def save_artifact(obj, path):
+    with open(path + ".tmp", "wb") as f:
+        pickle.dump(obj, f)
+    os.replace(path + ".tmp", path)
+
+# ------------------ TRAINING ------------------
+
+def fit_encoders(df):
+    return {col: LabelEncoder().fit(df[col].cat.categories) for col in CATEGORICAL_COLS}
+
+def encode(df, encoders):
+    # Maps each category once instead of transforming every row's string
+    for col in CATEGORICAL_COLS:
+        lookup = encoders[col].transform(df[col].cat.categories)
+        df[col] = lookup[df[col].cat.codes]
+    return df
+
+def save_models(models, backend, model_dir):
+    os.makedirs(model_dir, exist_ok=True)
+
+    for name, filename in ARTIFACTS[backend].items():
+        save_artifact(models[name], os.path.join(model_dir, filename))
+
+    if backend == "rf_gb":
+        # Memory-mapped flat export, loaded by utils/model_registry.py with FLAT_PREDICT
+        version = save_flat_artifacts(
+            model_dir, {"rf": models["rf"], "gb": models["gb"]}, models["encoders"]
+        )
+        print(f"Model version: {version}")
+
+    # Written last: switches the app over to the new backend
+    write_backend(backend, model_dir)
+
+def train_and_save(df, backend, model_dir, info=None):
+    total_start = time.perf_counter()
+
+    # Features are built per item; TimeSeriesSplit needs rows in date order
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+
+    # ------------------ ENCODING ------------------
+
+    encoders = fit_encoders(df)
+    df = encode(df, encoders)
+
+    X = df[FEATURE_COLS]
+    y = df["quantity"]
+
+    # ------------------ TIME SERIES SPLIT ------------------
+
+    folds = cross_validate(X, y, backend=backend, n_splits=5)
+
+    for fold in folds:
+        print(
+            f"Fold {fold['fold']}: R² {round(fold['r2'], 3)} | "
+            f"MAE {round(fold['mae'], 2)} | {fold['seconds']:.1f}s"
+        )
+
+    print("\n==============================")
+    print(f"Average R²: {round(np.mean([fold['r2'] for fold in folds]),3)}")
+    print(f"Average MAE: {round(np.mean([fold['mae'] for fold in folds]),2)}")
+    print("==============================")
+
+    # Train final model on full dataset
+    start = time.perf_counter()
+    models = fit_final(backend, X, y)
+    print(f"Final fit: {time.perf_counter() - start:.1f}s")
+
+    # Save models for the chosen backend
+    models["encoders"] = encoders
+    save_models(models, backend, model_dir)
+
+    now = datetime.utcnow().isoformat()
+    write_training_info(model_dir, {
+        **(info or {}),
+        "backend": backend,
+        "last_date": df["date"].max().isoformat(),
+        "last_full": now,
+        "trained_at": now
+    })
+
+    print(f"✅ Advanced ensemble model trained and saved in {time.perf_counter() - total_start:.1f}s.")
+
+def train_incremental(backend, model_dir, query=None, info=None):
+    # Warm-starts the saved models on rows saved since the last training,
+    # found by their _id whatever their date. Returns False when a full
+    # retrain is needed instead.
+    previous = read_training_info(model_dir)
+
+    if backend == "hist":
+        print("The hist backend is always retrained in full")
+        return False
 
-df = pd.DataFrame(list(db.sales.find({}, {"_id": 0})))
+    if not previous or previous.get("backend") != backend or not previous.get("last_id"):
+        return False
 
-if df.empty:
-    raise Exception("No data available")
+    if datetime.utcnow() - datetime.fromisoformat(previous["last_full"]) > pd.Timedelta(days=FULL_RETRAIN_DAYS):
+        print(f"Last full retrain is older than {FULL_RETRAIN_DAYS} days")
+        return False
 
-# ------------------ FEATURE ENGINEERING ------------------
+    start = time.perf_counter()
 
-df["date"] = pd.to_datetime(df["date"])
-df = df.sort_values(["item", "date"])
+    new_rows = pd.DataFrame(list(get_database().sales.find(
+        {**(query or {}), "_id": {"$gt": ObjectId(previous["last_id"])}},
+        {"_id": 1, **{col: 1 for col in NEW_ROW_KEY}}
+    )))
 
-df["day_of_week"] = df["date"].dt.weekday
-df["week_of_year"] = df["date"].dt.isocalendar().week.astype(int)
+    if new_rows.empty:
+        write_training_info(model_dir, {
+            **previous,
+            **(info or {}),
+            "trained_at": datetime.utcnow().isoformat()
+        })
+        print("✔ No new rows since last training")
+        return True
 
-# Fill exams null
-df["exams"] = df["exams"].fillna("None")
+    new_rows = new_rows.reindex(columns=["_id"] + NEW_ROW_KEY)
+    new_rows["date"] = pd.to_datetime(new_rows["date"])
+
+    # load_sales also reads the trailing rows of every item before the
+    # oldest new row, so the new rows get the same lag/rolling features as
+    # in a full run. Without owner_id in the frame, a global model also
+    # retrains the rare row of another owner that shares a new row's key.
+    df = load_sales(query, start=new_rows["date"].min())
+    if not df.empty:
+        df = df[_row_keys(df).isin(_row_keys(new_rows))]
+
+    if df.empty:
+        return False
 
-# Lag features
-df["lag_1"] = df.groupby("item")["quantity"].shift(1)
-df["lag_2"] = df.groupby("item")["quantity"].shift(2)
-df["lag_3"] = df.groupby("item")["quantity"].shift(3)
-df["lag_7"] = df.groupby("item")["quantity"].shift(7)
+    models = {}
+    for name, filename in ARTIFACTS[backend].items():
+        with open(os.path.join(model_dir, filename), "rb") as f:
+            models[name] = pickle.load(f)
+    models["backend"] = backend
+
+    df = df.sort_values("date", kind="stable").reset_index(drop=True)
+
+    for col in CATEGORICAL_COLS:
+        unseen = set(df[col].cat.remove_unused_categories().cat.categories) - set(models["encoders"][col].classes_)
+        if unseen:
+            print(f"New {col} values {sorted(unseen)[:5]}, encoders must be refit")
+            return False
+
+    df = encode(df, models["encoders"])
+
+    extend_models(models, df[FEATURE_COLS], df["quantity"])
+    save_models(models, backend, model_dir)
+
+    write_training_info(model_dir, {
+        **previous,
+        **(info or {}),
+        "last_date": max(pd.Timestamp(previous["last_date"]), df["date"].max()).isoformat(),
+        "last_id": str(new_rows["_id"].max()),
+        "trained_at": datetime.utcnow().isoformat()
+    })
+
+    print(f"✅ Incremental update on {len(df)} new rows in {time.perf_counter() - start:.1f}s.")
+    return True
+
+def main(backend=DEFAULT_BACKEND, incremental=False, start=None, sample=None):
+    print(f"Backend: {backend}")
+
+    if incremental and train_incremental(backend, MODEL_DIR):
+        return
+
+    # Taken before loading, so rows saved meanwhile count as new next time
+    last_id = latest_sale_id()
+    df = load_sales(start=start, sample=sample)
+
+    if df.empty:
+        raise Exception("No data available")
+
+    train_and_save(df, backend, MODEL_DIR, {"last_id": last_id})
+
+# ------------------ PER-OWNER PARTITIONS ------------------
+
+def train_partitions(backend=DEFAULT_BACKEND, owners=None, force=False, incremental=False,
+                     start=None, sample=None):
+    # Retrains only owners whose sales changed since their partition was built
+    for owner_id, watermark in sales_watermarks().items():
+
+        if owners and owner_id not in owners:
+            continue
+
+        if watermark["count"] < MIN_PARTITION_ROWS:
+            print(f"⏭ {owner_id}: {watermark['count']} rows, using global model")
+            continue
+
+        model_dir = partition_dir(owner_id)
+        info = read_training_info(model_dir)
+
+        if not force and info and info["watermark"] == watermark and info["backend"] == backend:
+            print(f"✔ {owner_id}: up to date")
+            continue
+
+        print(f"\n🔁 Training partition for {owner_id} ({backend})")
+
+        partition_info = {"owner_id": owner_id, "watermark": watermark}
+
+        if incremental and train_incremental(backend, model_dir, {"owner_id": owner_id}, partition_info):
+            continue
+
+        last_id = latest_sale_id({"owner_id": owner_id})
+        df = load_sales({"owner_id": owner_id}, start=start, sample=sample)
+        train_and_save(df, backend, model_dir, {**partition_info, "last_id": last_id})
+
+# Worker processes re-import this module, so training only runs when executed directly
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the demand forecasting models.")
+    parser.add_argument("--backend", choices=BACKENDS, default=DEFAULT_BACKEND)
+    parser.add_argument("--per-owner", action="store_true",
+                        help="train per-owner partitions for owners whose data changed")
+    parser.add_argument("--owner", action="append",
+                        help="limit --per-owner to this owner (repeatable)")
+    parser.add_argument("--force", action="store_true",
+                        help="retrain partitions even if their data is unchanged")
+    parser.add_argument("--incremental", action="store_true",
+                        help="warm-start rf_gb on rows saved since the last training, with a periodic full retrain")
+    parser.add_argument("--since", help="only train on rows on/after this date (YYYY-MM-DD)")
+    parser.add_argument("--sample", type=float,
+                        help="keep this fraction of training rows, e.g. 0.25")
+    parser.add_argument("--source", choices=["snapshot", "mongo"], default=SOURCE,
+                        help="read sales from the local Parquet snapshots or straight from MongoDB")
+    args = parser.parse_args()
 
-# Rolling features
-df["rolling_avg_3"] = df.groupby("item")["quantity"].transform(lambda x: x.rolling(3).mean())
-df["rolling_avg_7"] = df.groupby("item")["quantity"].transform(lambda x: x.rolling(7).mean())
-df["rolling_std_7"] = df.groupby("item")["quantity"].transform(lambda x: x.rolling(7).std())
+    SOURCE = args.source
 
-df = df.fillna(0)
+    options = {"incremental": args.incremental, "start": args.since, "sample": args.sample}
 
-# ------------------ ENCODING ------------------
-
-encoders = {}
-categorical_cols = ["weather", "exams", "region", "time_slot", "item"]
-
-for col in categorical_cols:
-    encoders[col] = LabelEncoder()
-    df[col] = encoders[col].fit_transform(df[col])
-
-# ------------------ FEATURES ------------------
-
-feature_cols = [
-    "weather", "exams", "region", "time_slot",
-    "day_of_week", "week_of_year", "item",
-    "lag_1", "lag_2", "lag_3", "lag_7",
-    "rolling_avg_3", "rolling_avg_7", "rolling_std_7"
-]
-
-X = df[feature_cols]
-y = df["quantity"]
-
-# ------------------ TIME SERIES SPLIT ------------------
-
-tscv = TimeSeriesSplit(n_splits=5)
-
-r2_scores = []
-mae_scores = []
-
-for train_index, test_index in tscv.split(X):
-    X_train, X_test = X.iloc[train_index], X.iloc[test_index]
-    y_train, y_test = y.iloc[train_index], y.iloc[test_index]
-
-    rf = RandomForestRegressor(
-        n_estimators=400,
-        max_depth=15,
-        min_samples_leaf=3,
-        random_state=42
-    )
-
-    gb = GradientBoostingRegressor(
-        n_estimators=300,
-        learning_rate=0.05,
-        max_depth=5,
-        random_state=42
-    )
-
-    rf.fit(X_train, y_train)
-    gb.fit(X_train, y_train)
-
-    rf_pred = rf.predict(X_test)
-    gb_pred = gb.predict(X_test)
-
-    final_pred = (rf_pred + gb_pred) / 2
-
-    r2_scores.append(r2_score(y_test, final_pred))
-    mae_scores.append(mean_absolute_error(y_test, final_pred))
-
-print("\n==============================")
-print(f"Average R²: {round(np.mean(r2_scores),3)}")
-print(f"Average MAE: {round(np.mean(mae_scores),2)}")
-print("==============================")
-
-# Train final model on full dataset
-rf.fit(X, y)
-gb.fit(X, y)
-
-# Save both models
-os.makedirs("models", exist_ok=True)
-
-with open("models/rf_model.pkl", "wb") as f:
-    pickle.dump(rf, f)
-
-with open("models/gb_model.pkl", "wb") as f:
-    pickle.dump(gb, f)
-
-with open("models/encoders.pkl", "wb") as f:
-    pickle.dump(encoders, f)
-
-print("✅ Advanced ensemble model trained and saved.")
\ No newline at end of file
+    if args.per_owner:
+        train_partitions(args.backend, owners=args.owner, force=args.force, **options)
+    else:
+        main(args.backend, **options)
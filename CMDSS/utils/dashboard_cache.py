@@ -0,0 +1,34 @@
+from utils.result_cache import ResultCache
+from utils.rollup import aggregate_rollup, rollup_distinct, rollup_kpis
+
+# ---------------- DASHBOARD CACHE ----------------
+# Dashboard queries keyed on (owner, data version, query). Reruns from
+# toggling views or filters are served from memory; a sale saved from any
+# process bumps the version (db_handler.bump_data_version), and the next miss
+# aggregates the daily rollup (utils/rollup.py).
+
+dashboard_cache = ResultCache("dashboard", max_entries=512, ttl=3600)
+
+
+def _cached(owner_id, version, key, query):
+    return dashboard_cache.get_or_compute((owner_id, version) + key, query)
+
+
+def dashboard_kpis(owner_id, version):
+    return _cached(owner_id, version, ("kpis",), lambda: rollup_kpis(owner_id))
+
+
+def dashboard_distinct(owner_id, version, field):
+    return _cached(owner_id, version, ("distinct", field), lambda: rollup_distinct(owner_id, field))
+
+
+def dashboard_aggregate(owner_id, version, by, stat="sum", items=None, weather=None):
+    key = (
+        "aggregate", by, stat,
+        None if items is None else tuple(sorted(items)),
+        None if weather is None else tuple(sorted(weather))
+    )
+    return _cached(
+        owner_id, version, key,
+        lambda: aggregate_rollup(owner_id, by, stat, items=items, weather=weather)
+    )
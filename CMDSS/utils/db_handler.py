@@ -1,13 +1,149 @@
 import streamlit as st
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING
+from pymongo.errors import OperationFailure
 import pandas as pd
+import numpy as np
+from itertools import islice
+from datetime import datetime
+
+# ---------------- INDEXES ----------------
+
+INDEXES = {
+    "sales": [
+        ([("owner_id", ASCENDING), ("item", ASCENDING), ("date", ASCENDING)],
+         {"name": "owner_item_date"}),
+        # Natural key of a sale (utils/sales_writer.py); existing duplicates
+        # block it until dedupe_sales.py has merged them
+        ([("owner_id", ASCENDING), ("date", ASCENDING), ("item", ASCENDING), ("time_slot", ASCENDING)],
+         {"name": "owner_date_item_slot", "unique": True})
+    ],
+    "users": [
+        ([("username", ASCENDING)], {"name": "username_unique", "unique": True})
+    ],
+    "feature_state": [
+        ([("owner_id", ASCENDING), ("item", ASCENDING)],
+         {"name": "owner_item", "unique": True})
+    ],
+    "sales_daily_rollup": [
+        ([("owner_id", ASCENDING), ("date", ASCENDING), ("item", ASCENDING),
+          ("time_slot", ASCENDING), ("weather", ASCENDING), ("exams", ASCENDING)],
+         {"name": "owner_rollup_key", "unique": True})
+    ]
+}
+
+def index_status(db):
+    status = {}
+    for collection, indexes in INDEXES.items():
+        existing = db[collection].index_information()
+        for _, options in indexes:
+            status[f"{collection}.{options['name']}"] = options["name"] in existing
+    return status
+
+def ensure_indexes(db):
+    for collection, indexes in INDEXES.items():
+        for keys, options in indexes:
+            try:
+                db[collection].create_index(keys, **options)
+            except OperationFailure:
+                # e.g. duplicate usernames or sales block a unique index; reported by index_status
+                pass
+    return index_status(db)
 
 @st.cache_resource
 def get_db():
     client = MongoClient(st.secrets["MONGO_URI"])
-    return client[st.secrets["DB_NAME"]]
+    db = client[st.secrets["DB_NAME"]]
+    ensure_indexes(db)
+    return db
+
+# ---------------- SALES LOADING ----------------
+
+CATEGORICAL_FIELDS = ["item", "weather", "exams", "region", "time_slot"]
+SALES_FIELDS = CATEGORICAL_FIELDS + ["quantity", "date"]
+
+# Values stored for missing fields, matching how the pages fill them
+FILL_VALUES = {"exams": "None"}
+
+def _empty_column(field, size):
+    if field in CATEGORICAL_FIELDS:
+        return np.full(size, -1, dtype=np.int32)
+    if field == "quantity":
+        return np.zeros(size, dtype=np.int32)
+    if field == "date":
+        return np.full(size, np.datetime64("NaT"), dtype="datetime64[ns]")
+    return np.empty(size, dtype=object)
+
+def iter_sales_columns(cursor, fields, lookups, batch_rows=5000):
+    # Yields typed columns for each batch_rows documents of the cursor.
+    # Categoricals are int32 codes into lookups, which grows across batches.
+    while True:
+        columns = {field: _empty_column(field, batch_rows) for field in fields}
+
+        count = 0
+        for doc in islice(cursor, batch_rows):
+            for field in fields:
+                value = doc.get(field)
+                if value is None:
+                    value = FILL_VALUES.get(field)
+                if value is None:
+                    continue
+                if field in lookups:
+                    columns[field][count] = lookups[field].setdefault(value, len(lookups[field]))
+                else:
+                    columns[field][count] = value
+            count += 1
+
+        if count == 0:
+            return
 
-def fetch_sales_data(owner_id):
+        yield {field: column[:count] for field, column in columns.items()}
+
+        if count < batch_rows:
+            return
+
+# ---------------- DATA VERSIONS ----------------
+# One counter per owner, bumped whenever their sales change. Caches key on it
+# so every process sees new data without polling the sales collection.
+
+def bump_data_version(owner_id, db=None):
+    if db is None:
+        db = get_db()
+    db.data_versions.update_one(
+        {"_id": owner_id},
+        {"$inc": {"version": 1}, "$set": {"last_write": datetime.utcnow()}},
+        upsert=True
+    )
+
+def data_version(owner_id):
+    db = get_db()
+    doc = db.data_versions.find_one({"_id": owner_id}, {"version": 1})
+    return doc["version"] if doc else 0
+
+def has_sales_data(owner_id):
     db = get_db()
-    data = list(db.sales.find({"owner_id": owner_id}, {"_id": 0}))
-    return pd.DataFrame(data)
+    return db.sales.find_one({"owner_id": owner_id}, {"_id": 1}) is not None
+
+# ---------------- AGGREGATIONS ----------------
+
+def fetch_recent_sales(owner_id, per_item=7):
+    # Trailing per_item rows of every item, picked server side with $topN
+    # (MongoDB 5.2+) so only O(items) documents cross the wire
+    db = get_db()
+    pipeline = [
+        {"$match": {"owner_id": owner_id}},
+        {"$group": {
+            "_id": "$item",
+            "recent": {"$topN": {
+                "n": per_item,
+                "sortBy": {"date": -1},
+                "output": {"date": "$date", "quantity": "$quantity"}
+            }}
+        }}
+    ]
+
+    rows = [
+        {"item": group["_id"], "date": entry["date"], "quantity": entry["quantity"]}
+        for group in db.sales.aggregate(pipeline)
+        for entry in reversed(group["recent"])
+    ]
+    return pd.DataFrame(rows, columns=["item", "date", "quantity"])
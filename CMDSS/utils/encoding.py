@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+# ---------------- CATEGORY ENCODING ----------------
+# Lookup tables built once per model load from the fitted LabelEncoders.
+# LabelEncoder codes are positions in classes_, so a whole column is encoded
+# with a single hash-table lookup instead of a transform() call per value.
+#
+# Values never seen in training get UNKNOWN_CODE so callers can tell them
+# apart. Only columns the hist backend fits as native categoricals handle it
+# differently, as a missing category. Everywhere else the columns are numeric
+# with split thresholds >= 0.5 (rf_gb trees, hist bins), so UNKNOWN_CODE
+# follows the same path as code 0 and predicts exactly like classes_[0].
+
+UNKNOWN_CODE = -1
+
+
+class CategoryEncoder:
+
+    def __init__(self, encoders):
+        self.tables = {col: pd.Index(encoder.classes_) for col, encoder in encoders.items()}
+        self.codes = {
+            col: {value: code for code, value in enumerate(encoder.classes_)}
+            for col, encoder in encoders.items()
+        }
+
+    def encode(self, col, values):
+        codes = self.tables[col].get_indexer(values)
+        return np.where(codes < 0, UNKNOWN_CODE, codes).astype(np.int32)
+
+    def encode_value(self, col, value):
+        return self.codes[col].get(value, UNKNOWN_CODE)
+
+    def unknown(self, col, values):
+        values = pd.Index(values).unique()
+        return list(values[self.tables[col].get_indexer(values) < 0])
@@ -0,0 +1,175 @@
+from datetime import datetime
+import pandas as pd
+from pymongo import ReplaceOne, UpdateOne
+from utils.db_handler import get_db, fetch_recent_sales
+from utils.features import FeatureBuilder
+
+# ---------------- FEATURE STATE ----------------
+# One document per (owner_id, item) holding the trailing quantities the
+# feature pipeline needs plus running totals, so predictions read O(items)
+# documents instead of the owner's full sales history.
+#
+# feature_state_owners marks owners whose state was built from their full
+# history. Owners with sales from before the store existed have no marker;
+# their first write rebuilds the state instead of starting it from that
+# write alone.
+
+STATE_WINDOW = FeatureBuilder().window
+
+
+def _state_rows(df):
+    df = df[["item", "date", "quantity"]].copy()
+    df["date"] = pd.to_datetime(df["date"])
+    df["quantity"] = df["quantity"].astype(int)
+    return df.sort_values(["item", "date"], kind="stable")
+
+
+def _state_summary(df):
+    grouped = df.groupby("item", sort=False, observed=True)
+
+    summary = grouped["quantity"].agg(["count", "sum"])
+    summary["sumsq"] = (df["quantity"] ** 2).groupby(df["item"], sort=False, observed=True).sum()
+    summary["last_date"] = grouped["date"].max()
+
+    recent = grouped.tail(STATE_WINDOW)
+    summary["recent"] = recent.groupby("item", sort=False, observed=True).apply(
+        lambda rows: [
+            {"date": d.to_pydatetime(), "quantity": int(q)}
+            for d, q in zip(rows["date"], rows["quantity"])
+        ]
+    )
+    return summary
+
+
+def feature_state_built(owner_id):
+    return get_db().feature_state_owners.find_one({"_id": owner_id}, {"_id": 1}) is not None
+
+
+def ensure_feature_state(owner_id):
+    if not feature_state_built(owner_id):
+        rebuild_feature_state(owner_id)
+
+
+def update_feature_state(owner_id, records):
+    if not records:
+        return
+
+    if not feature_state_built(owner_id):
+        # records are already in sales, so the rebuild includes them
+        rebuild_feature_state(owner_id)
+        return
+
+    summary = _state_summary(_state_rows(pd.DataFrame(records)))
+
+    operations = [
+        UpdateOne(
+            {"owner_id": owner_id, "item": item},
+            {
+                "$push": {"recent": {
+                    "$each": row["recent"],
+                    "$sort": {"date": 1},
+                    "$slice": -STATE_WINDOW
+                }},
+                "$inc": {
+                    "count": int(row["count"]),
+                    "sum": int(row["sum"]),
+                    "sumsq": int(row["sumsq"])
+                },
+                "$max": {"last_date": row["last_date"].to_pydatetime()}
+            },
+            upsert=True
+        )
+        for item, row in summary.iterrows()
+    ]
+
+    get_db().feature_state.bulk_write(operations, ordered=False)
+
+
+def rebuild_feature_state(owner_id):
+    # Totals and trailing windows are both computed server side, so a rebuild
+    # never pulls the owner's full history. Each item's document is replaced
+    # in place, so concurrent rebuilds and writers never collide on the
+    # owner_item index; the last one to finish wins.
+    db = get_db()
+
+    recent = fetch_recent_sales(owner_id, per_item=STATE_WINDOW)
+    recent = _state_summary(_state_rows(recent))["recent"] if not recent.empty else {}
+
+    totals = list(db.sales.aggregate([
+        {"$match": {"owner_id": owner_id}},
+        {"$group": {
+            "_id": "$item",
+            "count": {"$sum": 1},
+            "sum": {"$sum": "$quantity"},
+            "sumsq": {"$sum": {"$multiply": ["$quantity", "$quantity"]}},
+            "last_date": {"$max": "$date"}
+        }}
+    ]))
+
+    operations = [
+        ReplaceOne(
+            {"owner_id": owner_id, "item": row["_id"]},
+            {
+                "owner_id": owner_id,
+                "item": row["_id"],
+                # An item first sold after fetch_recent_sales ran has no window yet
+                "recent": recent.get(row["_id"], []),
+                "count": int(row["count"]),
+                "sum": int(row["sum"]),
+                "sumsq": int(row["sumsq"]),
+                "last_date": row["last_date"]
+            },
+            upsert=True
+        )
+        for row in totals
+    ]
+
+    if operations:
+        db.feature_state.bulk_write(operations, ordered=False)
+
+    # Items the owner no longer sells
+    db.feature_state.delete_many({
+        "owner_id": owner_id,
+        "item": {"$nin": [row["_id"] for row in totals]}
+    })
+
+    db.feature_state_owners.update_one(
+        {"_id": owner_id},
+        {"$set": {"built_at": datetime.utcnow()}},
+        upsert=True
+    )
+
+
+def load_feature_history(owner_id):
+    # Trailing window per item as long rows (item, date, quantity), the same
+    # shape FeatureBuilder.next_step expects from raw sales
+    db = get_db()
+    states = list(db.feature_state.find(
+        {"owner_id": owner_id},
+        {"_id": 0, "item": 1, "recent": 1}
+    ))
+
+    rows = [
+        {"item": state["item"], "date": entry["date"], "quantity": entry["quantity"]}
+        for state in states
+        for entry in state["recent"]
+    ]
+    return pd.DataFrame(rows, columns=["item", "date", "quantity"])
+
+
+def sales_watermark(owner_id):
+    # Total rows and latest date across the owner's items; changes with every
+    # saved sale, so it identifies the data a forecast was computed from
+    db = get_db()
+    totals = list(db.feature_state.aggregate([
+        {"$match": {"owner_id": owner_id}},
+        {"$group": {
+            "_id": None,
+            "count": {"$sum": "$count"},
+            "last_date": {"$max": "$last_date"}
+        }}
+    ]))
+
+    if not totals:
+        return {"count": 0, "last_date": None}
+    return {"count": totals[0]["count"], "last_date": str(totals[0]["last_date"])}
@@ -0,0 +1,80 @@
+import pandas as pd
+
+# ---------------- FEATURE PIPELINE ----------------
+# Shared by train_model.py and the Predictor so both see identical features.
+# Every feature for a row is built only from rows strictly before it, so the
+# features served for "tomorrow" are exactly what training would compute for
+# that row once it is recorded.
+
+LAGS = [1, 2, 3, 7]
+
+ROLLING = [
+    ("rolling_avg_3", 3, "mean"),
+    ("rolling_avg_7", 7, "mean"),
+    ("rolling_std_7", 7, "std")
+]
+
+HISTORY_FEATURES = [f"lag_{lag}" for lag in LAGS] + [name for name, _, _ in ROLLING]
+
+
+class FeatureBuilder:
+
+    def __init__(self, group_col="item"):
+        self.group_col = group_col
+        self.window = max(LAGS + [size for _, size, _ in ROLLING])
+
+    def prepare(self, df):
+        df = df.copy()
+        df["date"] = pd.to_datetime(df["date"])
+        if "exams" in df:
+            df["exams"] = df["exams"].fillna("None")
+        return df.sort_values([self.group_col, "date"], kind="stable").reset_index(drop=True)
+
+    def add_calendar(self, df):
+        df["day_of_week"] = df["date"].dt.weekday
+        df["week_of_year"] = df["date"].dt.isocalendar().week.astype(int)
+        return df
+
+    def add_history(self, df):
+        # Expects df sorted by group and date with a unique index
+        grouped = df.groupby(self.group_col, sort=False, observed=True)["quantity"]
+
+        for lag in LAGS:
+            df[f"lag_{lag}"] = grouped.shift(lag)
+
+        previous = grouped.shift(1)
+        rolling_groups = previous.groupby(df[self.group_col], sort=False, observed=True)
+
+        for name, size, agg in ROLLING:
+            rolled = getattr(rolling_groups.rolling(size, min_periods=size), agg)()
+            df[name] = rolled.droplevel(0)
+
+        df[HISTORY_FEATURES] = df[HISTORY_FEATURES].fillna(0)
+        return df
+
+    def transform(self, df):
+        df = self.prepare(df)
+        df = self.add_calendar(df)
+        return self.add_history(df)
+
+    def next_step(self, df, next_date):
+        # Features for one new row per group at next_date, built from the
+        # trailing window of each group only
+        df = self.prepare(df)
+
+        steps_back = df.groupby(self.group_col, sort=False, observed=True).cumcount(ascending=False)
+        recent = df[steps_back < self.window]
+
+        upcoming = pd.DataFrame({
+            self.group_col: recent[self.group_col].unique(),
+            "date": pd.Timestamp(next_date),
+            "is_next": True
+        })
+
+        combined = pd.concat([recent.assign(is_next=False), upcoming], ignore_index=True)
+        combined = combined.sort_values([self.group_col, "date"], kind="stable").reset_index(drop=True)
+        combined = self.add_history(self.add_calendar(combined))
+
+        return combined[combined["is_next"].astype(bool)].set_index(self.group_col)[
+            ["day_of_week", "week_of_year"] + HISTORY_FEATURES
+        ]
@@ -0,0 +1,190 @@
+import numpy as np
+import pandas as pd
+
+from utils.features import FeatureBuilder, HISTORY_FEATURES
+
+# ---------------- FEATURES ----------------
+
+FEATURE_COLS = [
+    "weather", "exams", "region", "time_slot",
+    "day_of_week", "week_of_year", "item"
+] + HISTORY_FEATURES
+
+CATEGORICAL_COLS = ["weather", "exams", "region", "time_slot", "item"]
+
+TREND_WINDOW = 6
+
+
+def recent_quantity_matrix(df):
+    # One row per item, column k holds the quantity k steps before the latest row
+    df = df.sort_values(["item", "date"], kind="stable")
+    steps_back = df.groupby("item", observed=True).cumcount(ascending=False)
+
+    recent = df[steps_back < TREND_WINDOW]
+    wide = (
+        recent.assign(step=steps_back[steps_back < TREND_WINDOW])
+        .pivot(index="item", columns="step", values="quantity")
+        .reindex(columns=range(TREND_WINDOW))
+    )
+    return wide.astype(float)
+
+
+def build_feature_matrix(df, context, encoder):
+    # encoder is the CategoryEncoder from the model bundle
+    next_date = pd.to_datetime(df["date"]).max() + pd.Timedelta(days=1)
+
+    features = FeatureBuilder().next_step(df, next_date)
+    for col in ["weather", "exams", "region", "time_slot"]:
+        features[col] = encoder.encode_value(col, context[col])
+    features["item"] = encoder.encode("item", features.index)
+
+    wide = recent_quantity_matrix(df).reindex(features.index)
+
+    return features[FEATURE_COLS], wide
+
+
+# ---------------- PREDICTION ----------------
+
+def demand_trend(wide):
+    recent_avg = wide[[0, 1, 2]].mean(axis=1)
+    previous_avg = wide[[3, 4, 5]].mean(axis=1)
+    enough_history = wide[[0, 1, 2, 3, 4, 5]].notna().all(axis=1)
+
+    return np.select(
+        [
+            enough_history & (recent_avg > previous_avg),
+            enough_history & (recent_avg < previous_avg)
+        ],
+        ["📈 Increasing", "📉 Decreasing"],
+        default="➖ Stable"
+    )
+
+
+def predict_quantity(models, features):
+    # models is the bundle from utils.model_registry.get_models()
+    if models.get("backend", "rf_gb") == "hist":
+        return models["hgb"].predict(features)
+    return (models["rf"].predict(features) + models["gb"].predict(features)) / 2
+
+
+def predict_demand(df, context, models):
+    features, wide = build_feature_matrix(df, context, models["encoder"])
+
+    predicted = np.maximum(0, np.round(predict_quantity(models, features))).astype(int)
+
+    level = np.select(
+        [predicted < 80, predicted < 150],
+        ["🔵 LOW", "🟡 MEDIUM"],
+        default="🔴 HIGH"
+    )
+    recommendation = np.select(
+        [predicted < 80, predicted < 150],
+        ["⚠ Reduce Preparation", "✅ Maintain Stock"],
+        default="🔥 Increase Preparation"
+    )
+
+    return (
+        pd.DataFrame({
+            "Item": features.index,
+            "Predicted Demand": predicted,
+            "Demand Level": level,
+            "Trend": demand_trend(wide),
+            "Recommendation": recommendation
+        })
+        .sort_values("Predicted Demand", ascending=False)
+        .reset_index(drop=True)
+    )
+
+
+# ---------------- CONTEXT GRIDS ----------------
+
+def expand_contexts(features, contexts, encoder):
+    # One feature row per item x context. contexts holds raw weather, exams,
+    # region and time_slot values; rows are item-major, contexts vary fastest.
+    n_items, n_contexts = len(features), len(contexts)
+
+    grid = features.iloc[np.repeat(np.arange(n_items), n_contexts)].reset_index(drop=True)
+    for col in ["weather", "exams", "region", "time_slot"]:
+        grid[col] = np.tile(encoder.encode(col, contexts[col]), n_items)
+    grid["item"] = np.repeat(encoder.encode("item", features.index), n_contexts)
+
+    return grid[FEATURE_COLS]
+
+
+def predict_scenarios(df, region, models, weather, exams, time_slots):
+    # Tomorrow's demand for every weather x exams x time slot combination,
+    # from one feature build and one predict call over the whole grid
+    next_date = pd.to_datetime(df["date"]).max() + pd.Timedelta(days=1)
+    features = FeatureBuilder().next_step(df, next_date)
+
+    scenarios = pd.MultiIndex.from_product(
+        [weather, exams, time_slots], names=["weather", "exams", "time_slot"]
+    ).to_frame(index=False)
+    scenarios["region"] = region
+
+    grid = expand_contexts(features, scenarios, models["encoder"])
+    predicted = np.maximum(0, np.round(predict_quantity(models, grid))).astype(int)
+
+    n_items, n_scenarios = len(features), len(scenarios)
+    return pd.DataFrame({
+        "Item": np.repeat(features.index, n_scenarios),
+        "Weather": np.tile(scenarios["weather"], n_items),
+        "Exams": np.tile(scenarios["exams"], n_items),
+        "Time Slot": np.tile(scenarios["time_slot"], n_items),
+        "Predicted Demand": predicted
+    })
+
+
+# ---------------- HORIZON ----------------
+
+def forecast_horizon(df, calendar, region, time_slots, models):
+    # calendar holds one {"date", "weather", "exams"} per day ahead, in order.
+    # Each day is a single model call over every item x time slot. Each slot's
+    # forecast is then appended as one row of the item, in the order of
+    # time_slots, so the following day's lag/rolling features see the day the
+    # way the journal records it (one row per slot, slots in journal order).
+    builder = FeatureBuilder()
+
+    history = df[["item", "date", "quantity"]].copy()
+    history["date"] = pd.to_datetime(history["date"])
+
+    n_slots = len(time_slots)
+
+    days = []
+
+    for day in calendar:
+        date = pd.Timestamp(day["date"])
+
+        features = builder.next_step(history, date)
+        items = features.index
+        n_items = len(items)
+
+        contexts = pd.DataFrame({
+            "weather": day["weather"],
+            "exams": day["exams"],
+            "region": region,
+            "time_slot": time_slots
+        })
+        grid = expand_contexts(features, contexts, models["encoder"])
+
+        predicted = np.maximum(0, predict_quantity(models, grid))
+
+        days.append(pd.DataFrame({
+            "Date": date,
+            "Item": np.repeat(items, n_slots),
+            "Time Slot": np.tile(time_slots, n_items),
+            "Weather": day["weather"],
+            "Exams": day["exams"],
+            "Predicted Demand": np.round(predicted).astype(int)
+        }))
+
+        history = pd.concat([
+            history,
+            pd.DataFrame({
+                "item": np.repeat(items, n_slots),
+                "date": date,
+                "quantity": predicted
+            })
+        ], ignore_index=True)
+
+    return pd.concat(days, ignore_index=True)
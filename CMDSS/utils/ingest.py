@@ -0,0 +1,113 @@
+import time
+import pandas as pd
+from utils.sales_writer import (
+    add_sales_quantities, insert_new_sales, rebuild_derived_state, sales_key
+)
+
+# ---------------- CSV INGESTION ----------------
+# Uploads are read, validated and written one bounded chunk at a time so
+# memory stays flat and no single batch gets near the 16MB BSON limit.
+#
+# A sale is keyed by (date, item, time_slot). Export rows sharing a key (split
+# transactions, several regions) are summed into one row that keeps the first
+# row's weather, exams and region: within a chunk before writing, across
+# chunks by adding to the row this upload inserted (one key per inserted row
+# is kept for the duration of the upload). Rows whose key was
+# already stored before the upload are not imported and count as conflicts.
+
+REQUIRED_COLUMNS = [
+    "item", "quantity", "weather",
+    "exams", "region", "time_slot", "date"
+]
+
+TEXT_COLUMNS = ["item", "weather", "exams", "region", "time_slot"]
+
+KEY_COLUMNS = ["date", "item", "time_slot"]
+
+CHUNK_ROWS = 5000
+
+
+def missing_columns(columns):
+    return [col for col in REQUIRED_COLUMNS if col not in columns]
+
+
+def coerce_chunk(chunk, owner_id):
+    chunk = chunk[REQUIRED_COLUMNS].copy()
+
+    chunk["exams"] = chunk["exams"].fillna("None")
+    for col in TEXT_COLUMNS:
+        chunk[col] = chunk[col].astype("string").str.strip()
+
+    chunk["quantity"] = pd.to_numeric(chunk["quantity"], errors="coerce")
+    chunk["date"] = pd.to_datetime(chunk["date"], errors="coerce")
+
+    valid = chunk.notna().all(axis=1) & (chunk["item"] != "") & (chunk["quantity"] >= 0)
+    rejected = int((~valid).sum())
+    chunk = chunk[valid]
+
+    rows = len(chunk)
+    chunk = chunk.groupby(KEY_COLUMNS, sort=False, as_index=False).agg(
+        quantity=("quantity", "sum"),
+        weather=("weather", "first"),
+        exams=("exams", "first"),
+        region=("region", "first")
+    )
+    merged = rows - len(chunk)
+
+    records = [
+        {
+            "owner_id": owner_id,
+            "item": item,
+            "quantity": int(quantity),
+            "weather": weather,
+            "exams": exams,
+            "region": region,
+            "time_slot": time_slot,
+            "date": date.to_pydatetime()
+        }
+        for item, quantity, weather, exams, region, time_slot, date in zip(
+            chunk["item"], chunk["quantity"], chunk["weather"], chunk["exams"],
+            chunk["region"], chunk["time_slot"], chunk["date"]
+        )
+    ]
+    return records, rejected, merged
+
+
+def ingest_csv(file, owner_id, chunk_rows=CHUNK_ROWS, on_progress=None):
+    file.seek(0, 2)
+    size = file.tell() or 1
+    file.seek(0)
+
+    stats = {"rows": 0, "inserted": 0, "rejected": 0, "merged": 0}
+    start = time.perf_counter()
+
+    # Keys of the rows this upload inserted
+    created = set()
+    added = 0
+
+    for chunk in pd.read_csv(file, chunksize=chunk_rows):
+        records, rejected, merged = coerce_chunk(chunk, owner_id)
+
+        repeats = [record for record in records if sales_key(record) in created]
+        fresh = [record for record in records if sales_key(record) not in created]
+
+        inserted = insert_new_sales(owner_id, fresh)
+        created.update(sales_key(record) for record in inserted)
+        added += add_sales_quantities(owner_id, repeats)
+
+        stats["rows"] += len(chunk)
+        stats["rejected"] += rejected
+        stats["merged"] += merged + len(repeats)
+        stats["inserted"] += len(inserted)
+
+        if on_progress is not None:
+            on_progress(min(file.tell() / size, 1.0), stats["rows"])
+
+    if added:
+        # Feature state and rollup only saw the first part of those rows
+        rebuild_derived_state(owner_id)
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    stats["conflicts"] = stats["rows"] - stats["rejected"] - stats["merged"] - stats["inserted"]
+    return stats
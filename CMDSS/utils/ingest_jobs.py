@@ -0,0 +1,163 @@
+import os
+import shutil
+import tempfile
+import traceback
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+import streamlit as st
+from utils.db_handler import get_db
+from utils.ingest import ingest_csv
+
+# ---------------- INGESTION JOBS ----------------
+# Uploads are spooled to disk and ingested on a process-wide worker pool so
+# the Streamlit script thread returns immediately. Job state lives in the
+# ingest_jobs collection and survives reruns and page changes.
+#
+# The pool only lives in memory, so while a job runs a heartbeat thread
+# writes its updated_at every HEARTBEAT_EVERY, also for the jobs queued
+# behind it in the same process; a long chunk write keeps beating. A job
+# whose heartbeat is older than STALE_AFTER lost its process (e.g. a restart)
+# and is marked failed when it is next read.
+
+MAX_WORKERS = 4
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+HEARTBEAT_EVERY = timedelta(seconds=30)
+
+STALE_AFTER = timedelta(minutes=5)
+
+PROCESS_ID = uuid.uuid4().hex
+
+
+@st.cache_resource
+def get_ingest_pool():
+    return ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="ingest")
+
+
+def _run_job(job_id, owner_id, path):
+    db = get_db()
+    now = datetime.utcnow()
+    started = db.ingest_jobs.update_one(
+        {"_id": job_id, "status": "queued"},
+        {"$set": {"status": "running", "started_at": now, "updated_at": now}}
+    )
+
+    if not started.modified_count:
+        # Already marked failed as stale
+        if os.path.exists(path):
+            os.remove(path)
+        return
+
+    def report(fraction, rows):
+        db.ingest_jobs.update_one(
+            {"_id": job_id, "status": "running"},
+            {"$set": {"progress": fraction, "rows": rows, "updated_at": datetime.utcnow()}}
+        )
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(target=_heartbeat, args=(db, job_id, stop), daemon=True)
+    heartbeat.start()
+
+    # Only a job still marked running is finished, so a job already failed
+    # as stale is never flipped back
+    try:
+        with open(path, "rb") as f:
+            stats = ingest_csv(f, owner_id, on_progress=report)
+
+        db.ingest_jobs.update_one(
+            {"_id": job_id, "status": "running"},
+            {"$set": {
+                "status": "done",
+                "progress": 1.0,
+                "stats": stats,
+                "updated_at": datetime.utcnow(),
+                "finished_at": datetime.utcnow()
+            }}
+        )
+    except Exception as e:
+        db.ingest_jobs.update_one(
+            {"_id": job_id, "status": "running"},
+            {"$set": {
+                "status": "failed",
+                "error": str(e),
+                "traceback": traceback.format_exc(),
+                "updated_at": datetime.utcnow(),
+                "finished_at": datetime.utcnow()
+            }}
+        )
+    finally:
+        stop.set()
+        heartbeat.join()
+        if os.path.exists(path):
+            os.remove(path)
+
+
+def _heartbeat(db, job_id, stop):
+    while not stop.wait(HEARTBEAT_EVERY.total_seconds()):
+        now = datetime.utcnow()
+        db.ingest_jobs.update_one(
+            {"_id": job_id, "status": "running"},
+            {"$set": {"updated_at": now}}
+        )
+        db.ingest_jobs.update_many(
+            {"process": PROCESS_ID, "status": "queued"},
+            {"$set": {"updated_at": now}}
+        )
+
+
+def submit_ingest_job(owner_id, uploaded_file):
+    fd, path = tempfile.mkstemp(prefix="ingest_", suffix=".csv")
+    with os.fdopen(fd, "wb") as f:
+        uploaded_file.seek(0)
+        shutil.copyfileobj(uploaded_file, f)
+
+    job_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+
+    get_db().ingest_jobs.insert_one({
+        "_id": job_id,
+        "owner_id": owner_id,
+        "filename": getattr(uploaded_file, "name", "upload.csv"),
+        "status": "queued",
+        "progress": 0.0,
+        "rows": 0,
+        "process": PROCESS_ID,
+        "path": path,
+        "created_at": now,
+        "updated_at": now
+    })
+
+    get_ingest_pool().submit(_run_job, job_id, owner_id, path)
+    return job_id
+
+
+def _fail_stale(db, job):
+    # Only if nothing touched the job since it was read
+    now = datetime.utcnow()
+    result = db.ingest_jobs.update_one(
+        {"_id": job["_id"], "status": job["status"], "updated_at": job.get("updated_at")},
+        {"$set": {
+            "status": "failed",
+            "error": "the server restarted before the upload finished, please upload the file again",
+            "updated_at": now,
+            "finished_at": now
+        }}
+    )
+    if result.modified_count and job.get("path") and os.path.exists(job["path"]):
+        os.remove(job["path"])
+
+
+def get_ingest_job(job_id):
+    db = get_db()
+    job = db.ingest_jobs.find_one({"_id": job_id}, {"traceback": 0})
+
+    if job is not None and job["status"] in ACTIVE_STATUSES:
+        heartbeat = job.get("updated_at") or job["created_at"]
+        if datetime.utcnow() - heartbeat > STALE_AFTER:
+            _fail_stale(db, job)
+            job = db.ingest_jobs.find_one({"_id": job_id}, {"traceback": 0})
+
+    return job
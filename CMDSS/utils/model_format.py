@@ -0,0 +1,184 @@
+import hashlib
+import json
+import os
+import shutil
+import numpy as np
+from sklearn.preprocessing import LabelEncoder
+
+# ---------------- FLAT MODEL FORMAT ----------------
+# Tree ensembles are exported as a handful of concatenated node arrays saved
+# as .npy files. Loading them with mmap_mode="r" lets every Streamlit worker
+# process share one copy of the forest through the OS page cache, which
+# unpickled sklearn trees cannot do (Tree.__setstate__ copies its nodes).
+#
+# models/manifest.json names the current version directory and carries the
+# encoder classes, so models and encoders are always versioned together.
+
+FORMAT_VERSION = 1
+
+NODE_ARRAYS = ["children_left", "children_right", "feature", "threshold", "value"]
+
+MANIFEST = "manifest.json"
+
+TREE_LEAF = -1
+
+PREDICT_CHUNK_ROWS = 2048
+
+
+class FlatTreeEnsemble:
+
+    def __init__(self, arrays, meta):
+        self.children_left = arrays["children_left"]
+        self.children_right = arrays["children_right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"]
+
+        self.init = meta["init"]
+        self.scale = meta["scale"]
+        self.feature_names_in_ = np.array(meta["feature_names"], dtype=object)
+
+    def predict(self, X):
+        if hasattr(X, "columns"):
+            X = X[list(self.feature_names_in_)]
+
+        # sklearn compares float32 inputs against float64 thresholds
+        X = np.asarray(X, dtype=np.float32)
+
+        # Row chunks cap the (rows x trees) temporaries
+        return np.concatenate([
+            self._predict_chunk(X[start:start + PREDICT_CHUNK_ROWS])
+            for start in range(0, len(X), PREDICT_CHUNK_ROWS)
+        ]) if len(X) else np.empty(0)
+
+    def _predict_chunk(self, X):
+        rows = np.arange(len(X))[:, None]
+        nodes = np.repeat(self.roots[None, :], len(X), axis=0)
+
+        # Walk every (sample, tree) pair one level per step until all sit on leaves
+        while True:
+            left = self.children_left[nodes]
+            internal = left != TREE_LEAF
+            if not internal.any():
+                break
+
+            go_left = X[rows, self.feature[nodes]] <= self.threshold[nodes]
+            nodes = np.where(
+                internal,
+                np.where(go_left, left, self.children_right[nodes]),
+                nodes
+            )
+
+        return self.init + self.scale * self.value[nodes].sum(axis=1)
+
+
+def flatten_ensemble(model):
+    if hasattr(model, "learning_rate"):
+        trees = [est.tree_ for est in np.ravel(model.estimators_)]
+        init = 0.0 if model.init_ == "zero" else float(np.ravel(model.init_.constant_)[0])
+        scale = float(model.learning_rate)
+    else:
+        trees = [est.tree_ for est in model.estimators_]
+        init = 0.0
+        scale = 1.0 / len(trees)
+
+    parts = {name: [] for name in NODE_ARRAYS}
+    roots = []
+    offset = 0
+
+    for tree in trees:
+        roots.append(offset)
+        for name in ["children_left", "children_right"]:
+            children = getattr(tree, name).astype(np.int64)
+            parts[name].append(np.where(children == TREE_LEAF, TREE_LEAF, children + offset))
+        parts["feature"].append(tree.feature.astype(np.int64))
+        parts["threshold"].append(tree.threshold.astype(np.float64))
+        parts["value"].append(tree.value[:, 0, 0].astype(np.float64))
+        offset += tree.node_count
+
+    arrays = {name: np.concatenate(chunks) for name, chunks in parts.items()}
+    arrays["roots"] = np.array(roots, dtype=np.int64)
+
+    meta = {
+        "init": init,
+        "scale": scale,
+        "n_trees": len(trees),
+        "feature_names": [str(name) for name in model.feature_names_in_]
+    }
+    return arrays, meta
+
+
+def save_flat_artifacts(models_dir, models, encoders):
+    exported = {name: flatten_ensemble(model) for name, model in models.items()}
+    encoder_classes = {col: [str(c) for c in enc.classes_] for col, enc in encoders.items()}
+
+    digest = hashlib.sha256()
+    for name, (arrays, meta) in sorted(exported.items()):
+        digest.update(json.dumps(meta, sort_keys=True).encode())
+        for array_name in sorted(arrays):
+            digest.update(arrays[array_name].tobytes())
+    digest.update(json.dumps(encoder_classes, sort_keys=True).encode())
+    version = digest.hexdigest()[:12]
+
+    flat_dir = os.path.join(models_dir, "flat")
+    target = os.path.join(flat_dir, version)
+
+    if not os.path.isdir(target):
+        staging = target + ".tmp"
+        shutil.rmtree(staging, ignore_errors=True)
+        for name, (arrays, _) in exported.items():
+            os.makedirs(os.path.join(staging, name))
+            for array_name, array in arrays.items():
+                np.save(os.path.join(staging, name, array_name + ".npy"), array)
+        os.replace(staging, target)
+
+    manifest = {
+        "format_version": FORMAT_VERSION,
+        "version": version,
+        "path": os.path.join("flat", version),
+        "models": {name: meta for name, (_, meta) in exported.items()},
+        "encoders": encoder_classes
+    }
+
+    manifest_path = os.path.join(models_dir, MANIFEST)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+    # Older versions can go; processes still mapping them keep their pages
+    for entry in os.listdir(flat_dir):
+        if entry != version:
+            shutil.rmtree(os.path.join(flat_dir, entry), ignore_errors=True)
+
+    return version
+
+
+def load_flat_artifacts(models_dir, mmap_mode="r"):
+    with open(os.path.join(models_dir, MANIFEST)) as f:
+        manifest = json.load(f)
+
+    if manifest["format_version"] != FORMAT_VERSION:
+        raise ValueError(
+            f"Unsupported model format {manifest['format_version']}, "
+            f"expected {FORMAT_VERSION}. Retrain with train_model.py."
+        )
+
+    base = os.path.join(models_dir, manifest["path"])
+    loaded = {}
+
+    for name, meta in manifest["models"].items():
+        arrays = {
+            array_name: np.load(os.path.join(base, name, array_name + ".npy"), mmap_mode=mmap_mode)
+            for array_name in NODE_ARRAYS + ["roots"]
+        }
+        loaded[name] = FlatTreeEnsemble(arrays, meta)
+
+    encoders = {}
+    for col, classes in manifest["encoders"].items():
+        encoders[col] = LabelEncoder()
+        encoders[col].classes_ = np.array(classes, dtype=object)
+    loaded["encoders"] = encoders
+
+    loaded["version"] = manifest["version"]
+    return loaded
@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import pickle
+import re
+import threading
+from utils.encoding import CategoryEncoder
+from utils.model_format import MANIFEST, load_flat_artifacts
+
+# ---------------- MODEL REGISTRY ----------------
+# Artifacts are loaded once per process and shared by every session. Each
+# call only stats the files; when train_model.py replaces them, the whole set
+# is reloaded and gets a new version. backend.json names the backend that was
+# trained last. The RF+GB pair predicts with the sklearn pickles by default;
+# with FLAT_PREDICT the memory-mapped flat format (manifest.json) is loaded
+# instead, sharing one copy of the trees across worker processes at the cost
+# of a several times slower numpy predict (benchmarks/bench_model_format.py).
+#
+# models/ holds the global model. Owners with their own partition get a
+# models/owners/<key>/ directory with the same layout, which takes precedence.
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "models")
+
+PARTITIONS_DIR = os.path.join(MODEL_DIR, "owners")
+
+ARTIFACTS = {
+    "rf_gb": {
+        "rf": "rf_model.pkl",
+        "gb": "gb_model.pkl",
+        "encoders": "encoders.pkl"
+    },
+    "hist": {
+        "hgb": "hgb_model.pkl",
+        "encoders": "encoders.pkl"
+    }
+}
+
+DEFAULT_BACKEND = "rf_gb"
+
+BACKEND_FILE = "backend.json"
+
+TRAINING_FILE = "training.json"
+
+FLAT_PREDICT = False
+
+_lock = threading.Lock()
+_loaded = {}
+
+
+# ---------------- PARTITIONS ----------------
+
+def owner_key(owner_id):
+    # Filesystem-safe, collision-free directory name for an owner
+    safe = re.sub(r"[^A-Za-z0-9_-]", "_", str(owner_id))[:40]
+    digest = hashlib.sha1(str(owner_id).encode()).hexdigest()[:8]
+    return f"{safe}-{digest}"
+
+
+def partition_dir(owner_id):
+    return os.path.join(PARTITIONS_DIR, owner_key(owner_id))
+
+
+def has_partition(owner_id):
+    return os.path.exists(os.path.join(partition_dir(owner_id), BACKEND_FILE))
+
+
+def read_training_info(model_dir):
+    path = os.path.join(model_dir, TRAINING_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_training_info(model_dir, info):
+    _write_json(os.path.join(model_dir, TRAINING_FILE), info)
+
+
+# ---------------- LOADING ----------------
+
+def _write_json(path, data):
+    with open(path + ".tmp", "w") as f:
+        json.dump(data, f, default=str)
+    os.replace(path + ".tmp", path)
+
+
+def current_backend(model_dir=MODEL_DIR):
+    path = os.path.join(model_dir, BACKEND_FILE)
+    if not os.path.exists(path):
+        return DEFAULT_BACKEND
+    with open(path) as f:
+        return json.load(f)["backend"]
+
+
+def write_backend(backend, model_dir=MODEL_DIR):
+    _write_json(os.path.join(model_dir, BACKEND_FILE), {"backend": backend})
+
+
+def _uses_flat(backend, model_dir):
+    return FLAT_PREDICT and backend == "rf_gb" and os.path.exists(os.path.join(model_dir, MANIFEST))
+
+
+def _signature(model_dir):
+    backend = current_backend(model_dir)
+
+    # The manifest is written last, so its stat covers the whole flat artifact set
+    filenames = [MANIFEST] if _uses_flat(backend, model_dir) else list(ARTIFACTS[backend].values())
+    if os.path.exists(os.path.join(model_dir, BACKEND_FILE)):
+        filenames.append(BACKEND_FILE)
+
+    signature = [backend]
+    for filename in filenames:
+        stat = os.stat(os.path.join(model_dir, filename))
+        signature.append((filename, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+
+def _load_pickles(backend, model_dir):
+    models = {}
+    digest = hashlib.sha256()
+
+    for name, filename in ARTIFACTS[backend].items():
+        with open(os.path.join(model_dir, filename), "rb") as f:
+            payload = f.read()
+        digest.update(payload)
+        models[name] = pickle.loads(payload)
+
+    models["version"] = digest.hexdigest()[:12]
+    return models
+
+
+def _load(backend, model_dir):
+    if _uses_flat(backend, model_dir):
+        models = load_flat_artifacts(model_dir)
+    else:
+        models = _load_pickles(backend, model_dir)
+    models["backend"] = backend
+    models["encoder"] = CategoryEncoder(models["encoders"])
+    return models
+
+
+def get_models(owner_id=None):
+    if owner_id is not None and has_partition(owner_id):
+        model_dir, partition = partition_dir(owner_id), owner_id
+    else:
+        model_dir, partition = MODEL_DIR, "global"
+
+    signature = _signature(model_dir)
+
+    with _lock:
+        entry = _loaded.get(model_dir)
+        if entry is None or entry["signature"] != signature:
+            models = _load(signature[0], model_dir)
+            models["partition"] = partition
+            entry = _loaded[model_dir] = {"signature": signature, "models": models}
+        return entry["models"]
@@ -0,0 +1,44 @@
+from utils.inference import forecast_horizon, predict_demand, predict_scenarios
+from utils.result_cache import ResultCache
+
+# ---------------- PREDICTION CACHE ----------------
+# Forecasts shared across sessions. Keys hold the owner's sales watermark
+# (row count and latest date) and the model version, so new sales from any
+# process or a deployed model miss the cache; writes made in this process
+# also drop the owner's entries straight away (see sales_writer.py).
+#
+# Callers read the watermark (feature_store.sales_watermark) before loading
+# the history they pass in. A sale saved in between then only makes a cached
+# forecast newer than its key; read afterwards, it could store a forecast of
+# the old history under the new watermark.
+
+PREDICTION_TTL = 30 * 60
+
+predictions = ResultCache("predictions", max_entries=256, ttl=PREDICTION_TTL)
+
+
+def _key(owner_id, watermark, models, kind, *inputs):
+    return (
+        owner_id, kind, watermark["count"], watermark["last_date"],
+        models["partition"], models["version"]
+    ) + inputs
+
+
+def cached_predict_demand(owner_id, watermark, history, context, models):
+    key = _key(owner_id, watermark, models, "tomorrow", tuple(sorted(context.items())))
+    return predictions.get_or_compute(key, lambda: predict_demand(history, context, models))
+
+
+def cached_scenarios(owner_id, watermark, history, region, models, weather, exams, time_slots):
+    key = _key(owner_id, watermark, models, "scenarios", region, tuple(weather), tuple(exams), tuple(time_slots))
+    return predictions.get_or_compute(
+        key, lambda: predict_scenarios(history, region, models, weather, exams, time_slots)
+    )
+
+
+def cached_horizon(owner_id, watermark, history, calendar, region, time_slots, models):
+    days = tuple((str(day["date"]), day["weather"], day["exams"]) for day in calendar)
+    key = _key(owner_id, watermark, models, "horizon", days, region, tuple(time_slots))
+    return predictions.get_or_compute(
+        key, lambda: forecast_horizon(history, calendar, region, time_slots, models)
+    )
@@ -1,11 +1,17 @@
 import pandas as pd
-def generate_historical_insights(df):
+from utils.rollup import load_rollup
+
+# Both read the daily rollup, where quantity is already summed per
+# (date, item, time_slot, weather, exams)
+
+def generate_historical_insights(owner_id):
+    df = load_rollup(owner_id, ["item", "weather"])
     insights = []
 
     if df.empty:
         return ["No data available."]
 
-    top_item = df.groupby("item")["quantity"].sum().idxmax()
+    top_item = df.groupby("item", observed=True)["quantity"].sum().idxmax()
     insights.append(f"🔥 Most popular item: {top_item}")
 
     total_sales = df["quantity"].sum()
@@ -16,13 +22,14 @@ def generate_historical_insights(df):
         insights.append("🌧 Rainy days increase demand.")
 
     return insights
-def generate_menu_plan(df):
+def generate_menu_plan(owner_id):
+    df = load_rollup(owner_id, ["date", "time_slot", "item"])
 
     df["date"] = pd.to_datetime(df["date"])
     df["day_name"] = df["date"].dt.day_name()
 
     grouped = df.groupby(
-        ["day_name", "time_slot", "item"]
+        ["day_name", "time_slot", "item"], observed=True
     )["quantity"].sum().reset_index()
 
     menu_plan = {}
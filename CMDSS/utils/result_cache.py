@@ -0,0 +1,94 @@
+import threading
+import time
+from collections import OrderedDict
+
+# ---------------- RESULT CACHE ----------------
+# Process-wide LRU with a TTL, shared by every Streamlit session like the
+# model registry. Keys start with the owner_id so one owner's entries can be
+# dropped when their sales change. Concurrent misses on the same key compute
+# once; the other callers wait and reuse the result. Cached values are
+# shared, so callers must not modify them in place.
+
+_MISSING = object()
+
+_caches = []
+
+
+class ResultCache:
+
+    def __init__(self, name, max_entries=256, ttl=1800):
+        self.name = name
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._computing = {}
+        self._lock = threading.Lock()
+        _caches.append(self)
+
+    def _lookup(self, key):
+        # Caller holds self._lock
+        entry = self._entries.get(key)
+        if entry is None:
+            return _MISSING
+        expires, value = entry
+        if expires < time.monotonic():
+            del self._entries[key]
+            return _MISSING
+        self._entries.move_to_end(key)
+        return value
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            value = self._lookup(key)
+            if value is not _MISSING:
+                self.hits += 1
+                return value
+            key_lock = self._computing.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                value = self._lookup(key)
+                if value is not _MISSING:
+                    self.hits += 1
+                    return value
+
+            try:
+                value = compute()
+            finally:
+                with self._lock:
+                    self._computing.pop(key, None)
+
+            with self._lock:
+                self.misses += 1
+                self._entries[key] = (time.monotonic() + self.ttl, value)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+
+        return value
+
+    def invalidate(self, owner_id):
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == owner_id]:
+                del self._entries[key]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "cache": self.name,
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def invalidate_owner(owner_id):
+    # Called after an owner's sales are written
+    for cache in _caches:
+        cache.invalidate(owner_id)
+
+
+def cache_stats():
+    return [cache.stats() for cache in _caches]
@@ -0,0 +1,142 @@
+import pandas as pd
+from pymongo import InsertOne, UpdateOne
+from utils.db_handler import FILL_VALUES, get_db
+
+# ---------------- DAILY ROLLUP ----------------
+# sales_daily_rollup holds one document per (owner, date, item, time_slot,
+# weather, exams) with the sum, count and sum of squares of quantity. Writes
+# $inc it in the same pass as the feature state; backfill_rollup.py builds it
+# for existing data. The dashboard and utils/processor.py aggregate these
+# pre-summed documents instead of raw sales rows.
+
+ROLLUP_KEY = ["owner_id", "date", "item", "time_slot", "weather", "exams"]
+
+BATCH_ROWS = 5000
+
+
+def _key(record):
+    return tuple(
+        record.get(field) if record.get(field) is not None else FILL_VALUES.get(field)
+        for field in ROLLUP_KEY
+    )
+
+
+def update_rollup(db, records):
+    totals = {}
+    for record in records:
+        quantity = int(record["quantity"])
+        total = totals.setdefault(_key(record), [0, 0, 0])
+        total[0] += quantity
+        total[1] += 1
+        total[2] += quantity * quantity
+
+    if not totals:
+        return
+
+    db.sales_daily_rollup.bulk_write([
+        UpdateOne(
+            dict(zip(ROLLUP_KEY, key)),
+            {"$inc": {"sum": total[0], "count": total[1], "sumsq": total[2]}},
+            upsert=True
+        )
+        for key, total in totals.items()
+    ], ordered=False)
+
+
+def rebuild_rollup(db, owner_id):
+    # Grouped server side and inserted in batches, so the owner's raw rows
+    # never sit in memory; returns the number of rollup documents
+    db.sales_daily_rollup.delete_many({"owner_id": owner_id})
+
+    groups = db.sales.aggregate([
+        {"$match": {"owner_id": owner_id}},
+        {"$group": {
+            "_id": {
+                field: {"$ifNull": [f"${field}", FILL_VALUES.get(field)]}
+                for field in ROLLUP_KEY
+            },
+            "sum": {"$sum": "$quantity"},
+            "count": {"$sum": 1},
+            "sumsq": {"$sum": {"$multiply": ["$quantity", "$quantity"]}}
+        }}
+    ], allowDiskUse=True)
+
+    written = 0
+    batch = []
+    for group in groups:
+        batch.append(InsertOne({**group.pop("_id"), **group}))
+        if len(batch) == BATCH_ROWS:
+            written += db.sales_daily_rollup.bulk_write(batch, ordered=False).inserted_count
+            batch = []
+    if batch:
+        written += db.sales_daily_rollup.bulk_write(batch, ordered=False).inserted_count
+
+    return written
+
+
+# ---------------- READING ----------------
+
+def rollup_filter(owner_id, items=None, weather=None):
+    match = {"owner_id": owner_id}
+    if items is not None:
+        match["item"] = {"$in": list(items)}
+    if weather is not None:
+        match["weather"] = {"$in": list(weather)}
+    return match
+
+
+def rollup_kpis(owner_id):
+    db = get_db()
+    items = list(db.sales_daily_rollup.aggregate([
+        {"$match": rollup_filter(owner_id)},
+        {"$group": {"_id": "$item", "quantity": {"$sum": "$sum"}, "rows": {"$sum": "$count"}}},
+        {"$sort": {"quantity": -1}}
+    ]))
+
+    if not items:
+        return None
+
+    total_sales = sum(row["quantity"] for row in items)
+    total_rows = sum(row["rows"] for row in items)
+
+    return {
+        "total_sales": total_sales,
+        "avg_sales": round(total_sales / total_rows, 2),
+        "top_item": items[0]["_id"],
+        "total_items": len(items)
+    }
+
+
+def rollup_distinct(owner_id, field):
+    db = get_db()
+    return sorted(v for v in db.sales_daily_rollup.distinct(field, {"owner_id": owner_id}) if v is not None)
+
+
+def aggregate_rollup(owner_id, by, stat="sum", items=None, weather=None):
+    # stat is "sum" or "avg"; averages are per raw sales row, as before
+    db = get_db()
+    rows = list(db.sales_daily_rollup.aggregate([
+        {"$match": rollup_filter(owner_id, items, weather)},
+        {"$group": {
+            "_id": {"$ifNull": [f"${by}", "None"]},
+            "sum": {"$sum": "$sum"},
+            "count": {"$sum": "$count"}
+        }},
+        {"$sort": {"_id": 1}}
+    ]))
+
+    df = pd.DataFrame(rows, columns=["_id", "sum", "count"])
+    quantity = df["sum"] if stat == "sum" else df["sum"] / df["count"]
+    return pd.DataFrame({by: df["_id"], "quantity": quantity})
+
+
+def load_rollup(owner_id, fields):
+    # Rollup rows with the summed units as "quantity" and the raw row count
+    # as "rows", shaped like sales for the pandas helpers in processor.py
+    db = get_db()
+    projection = {"_id": 0, "sum": 1, "count": 1, **{field: 1 for field in fields}}
+    docs = list(db.sales_daily_rollup.find({"owner_id": owner_id}, projection))
+    return (
+        pd.DataFrame(docs, columns=list(fields) + ["sum", "count"])
+        .rename(columns={"sum": "quantity", "count": "rows"})
+    )
@@ -0,0 +1,159 @@
+import time
+from pymongo import DeleteMany, UpdateOne
+from pymongo.errors import AutoReconnect, BulkWriteError
+from utils.db_handler import get_db, bump_data_version
+from utils.feature_store import update_feature_state, rebuild_feature_state
+from utils.result_cache import invalidate_owner
+from utils.rollup import rebuild_rollup, update_rollup
+
+# ---------------- SALES WRITES ----------------
+# Rows are upserted on their natural key with $setOnInsert, so a batch can be
+# retried or re-submitted without creating duplicates: the first write wins.
+# The key is backed by a unique index (db_handler.INDEXES), so two writers
+# racing on the same key still store one row.
+#
+# The rollup and feature state are derived from the inserted rows. Either
+# one that cannot be updated incrementally (a retried write, a failure part
+# way) is rebuilt from sales, and the data version is bumped whatever
+# happened, so caches never outlive a stored row.
+
+SALES_KEY = ["owner_id", "date", "item", "time_slot"]
+
+DUPLICATE_KEY = 11000
+
+
+def _upsert(db, operations):
+    # Positions of the operations that inserted a row. Losing an insert race
+    # to another writer is a duplicate key error, the same outcome as a
+    # matched upsert.
+    try:
+        return list(db.sales.bulk_write(operations, ordered=False).upserted_ids)
+    except BulkWriteError as e:
+        if any(error["code"] != DUPLICATE_KEY for error in e.details["writeErrors"]):
+            raise
+        return [upsert["index"] for upsert in e.details["upserted"]]
+
+
+def sales_key(record):
+    return tuple(record[field] for field in SALES_KEY)
+
+
+def _update_derived(db, owner_id, inserted, rebuild):
+    # Rollup first: it is what the dashboards read straight after a save
+    derived = [
+        (lambda: update_rollup(db, inserted), lambda: rebuild_rollup(db, owner_id)),
+        (lambda: update_feature_state(owner_id, inserted), lambda: rebuild_feature_state(owner_id))
+    ]
+
+    error = None
+    for update, full in derived:
+        try:
+            if not rebuild:
+                try:
+                    update()
+                    continue
+                except Exception:
+                    pass
+            full()
+        except Exception as e:
+            error = error or e
+
+    if error is not None:
+        raise error
+
+
+def save_sales_records(owner_id, records, retries=3):
+    return len(insert_new_sales(owner_id, records, retries))
+
+
+def insert_new_sales(owner_id, records, retries=3):
+    # Returns the records that were inserted
+    if not records:
+        return []
+
+    operations = [
+        UpdateOne(
+            {field: record[field] for field in SALES_KEY},
+            {"$setOnInsert": record},
+            upsert=True
+        )
+        for record in records
+    ]
+
+    db = get_db()
+
+    for attempt in range(retries + 1):
+        try:
+            upserted = _upsert(db, operations)
+            break
+        except AutoReconnect:
+            if attempt == retries:
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+    inserted = [records[index] for index in upserted]
+
+    try:
+        # A failed attempt may have written rows we can no longer attribute
+        _update_derived(db, owner_id, inserted, rebuild=attempt > 0)
+    finally:
+        # Caches of this owner were computed from the old rows
+        if inserted or attempt > 0:
+            bump_data_version(owner_id)
+        invalidate_owner(owner_id)
+
+    return inserted
+
+
+def add_sales_quantities(owner_id, records):
+    # Adds each record's quantity to the stored row with its key. Not
+    # idempotent, so only for rows the caller itself inserted; the caller
+    # then runs rebuild_derived_state once.
+    if not records:
+        return 0
+
+    result = get_db().sales.bulk_write([
+        UpdateOne(
+            {field: record[field] for field in SALES_KEY},
+            {"$inc": {"quantity": record["quantity"]}}
+        )
+        for record in records
+    ], ordered=False)
+    return result.modified_count
+
+
+def rebuild_derived_state(owner_id):
+    try:
+        _update_derived(get_db(), owner_id, [], rebuild=True)
+    finally:
+        bump_data_version(owner_id)
+        invalidate_owner(owner_id)
+
+
+def merge_duplicate_sales(db, owner_id=None):
+    # Rows saved before the unique index existed may repeat a key. Their
+    # quantities are summed into the oldest row, which keeps the totals the
+    # dashboards showed. Returns {owner_id: rows removed}.
+    match = {} if owner_id is None else {"owner_id": owner_id}
+    groups = db.sales.aggregate([
+        {"$match": match},
+        {"$group": {
+            "_id": {field: f"${field}" for field in SALES_KEY},
+            "keep": {"$min": "$_id"},
+            "quantity": {"$sum": "$quantity"},
+            "rows": {"$sum": 1}
+        }},
+        {"$match": {"rows": {"$gt": 1}}}
+    ], allowDiskUse=True)
+
+    operations = []
+    removed = {}
+    for group in groups:
+        key = group["_id"]
+        operations.append(UpdateOne({"_id": group["keep"]}, {"$set": {"quantity": group["quantity"]}}))
+        operations.append(DeleteMany({**key, "_id": {"$ne": group["keep"]}}))
+        removed[key["owner_id"]] = removed.get(key["owner_id"], 0) + group["rows"] - 1
+
+    if operations:
+        db.sales.bulk_write(operations)
+    return removed
@@ -0,0 +1,274 @@
+import json
+import os
+import uuid
+from contextlib import contextmanager
+from functools import reduce
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from bson import ObjectId
+
+from utils.db_handler import CATEGORICAL_FIELDS, SALES_FIELDS, get_db, iter_sales_columns
+from utils.model_registry import owner_key
+
+# ---------------- SALES SNAPSHOTS ----------------
+# Each owner's sales are mirrored to local Parquet parts under
+# snapshots/<owner key>/. A refresh only pulls documents with an _id above the
+# stored watermark and appends them as one new part; manifest.json lists the
+# committed parts, so a reader never sees a half-written file. If the row
+# count no longer matches Mongo (late writes below the watermark, deleted
+# rows), the owner's snapshot is rebuilt. Reads push column and row filters down to the
+# Parquet scan, so only the requested columns and row groups are decoded.
+#
+# train_model.py and the app refresh from separate processes, so each owner
+# directory has a lock file: refreshes hold it exclusively, reads shared.
+# A manifest listing a part that no longer exists is rebuilt from Mongo.
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "snapshots")
+
+MANIFEST = "manifest.json"
+
+LOCK_FILE = ".lock"
+
+SCHEMA = pa.schema(
+    [(field, pa.string()) for field in CATEGORICAL_FIELDS]
+    + [("quantity", pa.int32()), ("date", pa.timestamp("ns"))]
+)
+
+BATCH_ROWS = 50000
+
+ROW_GROUP_ROWS = 100000
+
+# Parts are merged into one date-sorted file once an owner has this many
+MAX_PARTS = 32
+
+
+def snapshot_dir(owner_id):
+    return os.path.join(SNAPSHOT_DIR, owner_key(owner_id))
+
+
+@contextmanager
+def _owner_lock(owner_id, exclusive):
+    # flock is per open file, so it also serialises threads of one process
+    path = snapshot_dir(owner_id)
+    os.makedirs(path, exist_ok=True)
+
+    with open(os.path.join(path, LOCK_FILE), "a+") as f:
+        if fcntl is not None:
+            fcntl.flock(f, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        else:
+            # msvcrt only has exclusive locks; LK_LOCK gives up after 10s
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    pass
+        try:
+            yield path
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_manifest(path):
+    manifest_path = os.path.join(path, MANIFEST)
+    if not os.path.exists(manifest_path):
+        return {"parts": [], "rows": 0, "watermark": None}
+    with open(manifest_path) as f:
+        return json.load(f)
+
+
+def _parts_exist(path, manifest):
+    return all(os.path.exists(os.path.join(path, part)) for part in manifest["parts"])
+
+
+def _write_manifest(path, manifest):
+    manifest_path = os.path.join(path, MANIFEST)
+    with open(manifest_path + ".tmp", "w") as f:
+        json.dump(manifest, f)
+    os.replace(manifest_path + ".tmp", manifest_path)
+
+
+def _batch_table(columns, lookups):
+    arrays = []
+    for field in SCHEMA.names:
+        if field in lookups:
+            codes = columns[field]
+            indices = pa.array(codes, mask=codes < 0)
+            arrays.append(pa.DictionaryArray.from_arrays(indices, list(lookups[field])).cast(pa.string()))
+        else:
+            arrays.append(pa.array(columns[field], type=SCHEMA.field(field).type, from_pandas=True))
+    return pa.Table.from_arrays(arrays, schema=SCHEMA)
+
+
+def _export_part(db, path, query):
+    # Streams the matching documents into a new part file; returns
+    # (filename, rows, highest _id) or None when nothing matched
+    fields = SALES_FIELDS + ["_id"]
+    lookups = {field: {} for field in CATEGORICAL_FIELDS}
+    cursor = db.sales.find(query, {field: 1 for field in fields}, batch_size=BATCH_ROWS)
+
+    filename = f"part-{uuid.uuid4().hex[:12]}.parquet"
+    writer = None
+    rows = 0
+    watermark = None
+
+    try:
+        for columns in iter_sales_columns(cursor, fields, lookups, BATCH_ROWS):
+            batch_max = max(columns["_id"])
+            watermark = batch_max if watermark is None else max(watermark, batch_max)
+
+            table = _batch_table(columns, lookups).sort_by("date")
+            if writer is None:
+                writer = pq.ParquetWriter(os.path.join(path, filename), SCHEMA)
+            writer.write_table(table, row_group_size=ROW_GROUP_ROWS)
+            rows += table.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+
+    if writer is None:
+        return None
+    return filename, rows, str(watermark)
+
+
+def _compact(path, manifest):
+    table = _dataset(path, manifest["parts"]).to_table().sort_by("date")
+    filename = f"part-{uuid.uuid4().hex[:12]}.parquet"
+    pq.write_table(table, os.path.join(path, filename), row_group_size=ROW_GROUP_ROWS)
+    manifest["parts"] = [filename]
+
+
+def _remove_unlisted(path, manifest):
+    for filename in os.listdir(path):
+        if filename.startswith("part-") and filename not in manifest["parts"]:
+            os.remove(os.path.join(path, filename))
+
+
+def refresh_snapshot(db, owner_id):
+    # Brings the owner's snapshot up to date with Mongo; returns its row count
+    with _owner_lock(owner_id, exclusive=True) as path:
+        manifest = _read_manifest(path)
+        expected = db.sales.count_documents({"owner_id": owner_id})
+
+        if not _parts_exist(path, manifest):
+            manifest = {"parts": [], "rows": 0, "watermark": None}
+        elif manifest["rows"] == expected:
+            return expected
+
+        for attempt in ("incremental", "rebuild"):
+            query = {"owner_id": owner_id}
+            if attempt == "incremental" and manifest["watermark"] is not None:
+                query["_id"] = {"$gt": ObjectId(manifest["watermark"])}
+            else:
+                manifest = {"parts": [], "rows": 0, "watermark": None}
+
+            part = _export_part(db, path, query)
+            if part is not None:
+                filename, rows, watermark = part
+                manifest["parts"].append(filename)
+                manifest["rows"] += rows
+                manifest["watermark"] = watermark
+
+            # Late writes below the watermark and deleted rows show up as a
+            # count mismatch
+            if manifest["rows"] == expected:
+                break
+
+        if len(manifest["parts"]) > MAX_PARTS:
+            _compact(path, manifest)
+
+        _write_manifest(path, manifest)
+        _remove_unlisted(path, manifest)
+
+        return manifest["rows"]
+
+
+# ---------------- READING ----------------
+
+def _dataset(path, parts):
+    return ds.dataset([os.path.join(path, part) for part in parts], schema=SCHEMA, format="parquet")
+
+
+def snapshot_filter(start=None, end=None, items=None, weather=None, item_from=None, item_to=None):
+    # item_from/item_to bound item names as [item_from, item_to)
+    conditions = []
+    if start is not None:
+        conditions.append(ds.field("date") >= pa.scalar(pd.Timestamp(start), type=pa.timestamp("ns")))
+    if end is not None:
+        conditions.append(ds.field("date") <= pa.scalar(pd.Timestamp(end), type=pa.timestamp("ns")))
+    if items is not None:
+        conditions.append(ds.field("item").isin(list(items)))
+    if weather is not None:
+        conditions.append(ds.field("weather").isin(list(weather)))
+    if item_from is not None:
+        conditions.append(ds.field("item") >= item_from)
+    if item_to is not None:
+        conditions.append(ds.field("item") < item_to)
+    return reduce(lambda a, b: a & b, conditions) if conditions else None
+
+
+@contextmanager
+def _committed_parts(owner_id):
+    # Yields (path, parts) under a shared lock, rebuilding the snapshot first
+    # if the manifest lists a part that is missing
+    for attempt in ("read", "rebuild"):
+        with _owner_lock(owner_id, exclusive=False) as path:
+            manifest = _read_manifest(path)
+            if _parts_exist(path, manifest):
+                yield path, manifest["parts"]
+                return
+        if attempt == "read":
+            refresh_snapshot(get_db(), owner_id)
+
+    raise FileNotFoundError(f"Snapshot parts of {owner_id} are missing after a rebuild")
+
+
+def scan_snapshots(owner_ids, columns=None, **filters):
+    # One Arrow table over the committed parts of every listed owner
+    tables = []
+    for owner_id in owner_ids:
+        with _committed_parts(owner_id) as (path, parts):
+            if parts:
+                tables.append(
+                    _dataset(path, parts).to_table(
+                        columns=columns, filter=snapshot_filter(**filters)
+                    )
+                )
+
+    if not tables:
+        schema = SCHEMA if columns is None else pa.schema([SCHEMA.field(c) for c in columns])
+        return schema.empty_table()
+    return pa.concat_tables(tables)
+
+
+def snapshot_item_counts(owner_ids):
+    # Rows per item over every listed owner, counted one record batch at a time
+    counts = {}
+    for owner_id in owner_ids:
+        with _committed_parts(owner_id) as (path, parts):
+            if not parts:
+                continue
+            for batch in _dataset(path, parts).to_batches(columns=["item"]):
+                for entry in pc.value_counts(batch.column(0)).to_pylist():
+                    counts[entry["values"]] = counts.get(entry["values"], 0) + entry["counts"]
+    return counts
+
+
+def read_snapshot(owner_id, columns=None, **filters):
+    table = scan_snapshots([owner_id], columns, **filters)
+    return table.to_pandas(strings_to_categorical=True)
@@ -0,0 +1,151 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.ensemble import (
+    RandomForestRegressor, GradientBoostingRegressor, HistGradientBoostingRegressor
+)
+from sklearn.model_selection import TimeSeriesSplit
+from sklearn.metrics import r2_score, mean_absolute_error
+from utils.inference import CATEGORICAL_COLS, predict_quantity
+
+# ---------------- TRAINING ----------------
+# CV folds run concurrently in worker processes and the forest inside each
+# fold builds its trees on the cores left over, so the machine stays busy
+# without oversubscribing it. Gradient boosting is inherently sequential;
+# fold-level parallelism is what speeds it up.
+#
+# Two backends are available: "rf_gb", the RandomForest + GradientBoosting
+# average, and "hist", a single HistGradientBoostingRegressor that bins
+# features and treats the encoded categoricals as native categories.
+
+BACKENDS = ["rf_gb", "hist"]
+
+RF_PARAMS = {
+    "n_estimators": 400,
+    "max_depth": 15,
+    "min_samples_leaf": 3,
+    "random_state": 42
+}
+
+GB_PARAMS = {
+    "n_estimators": 300,
+    "learning_rate": 0.05,
+    "max_depth": 5,
+    "random_state": 42
+}
+
+
+HIST_PARAMS = {
+    "max_iter": 300,
+    "learning_rate": 0.05,
+    "max_leaf_nodes": 31,
+    "random_state": 42
+}
+
+# Incremental retraining (warm_start) adds this much capacity per run, fitted
+# on the new rows only. The forest keeps its newest MAX_RF_TREES trees.
+# "hist" is always refit in full: HistGradientBoosting rebuilds its bin
+# mapper and category sets on every fit, so a warm start on new rows alone
+# would treat any value they lack as missing in every tree, old ones too.
+RF_INCREMENT = 50
+GB_INCREMENT = 30
+MAX_RF_TREES = 800
+
+# HistGradientBoosting supports at most max_bins (255) categories per feature;
+# larger menus keep the item code as an ordinary numeric feature
+MAX_NATIVE_CATEGORIES = 255
+
+
+def cpu_count():
+    return os.cpu_count() or 1
+
+
+def fit_rf(X, y, n_jobs=1):
+    return RandomForestRegressor(**RF_PARAMS, n_jobs=n_jobs).fit(X, y)
+
+
+def fit_gb(X, y):
+    return GradientBoostingRegressor(**GB_PARAMS).fit(X, y)
+
+
+def categorical_mask(X):
+    return [
+        col in CATEGORICAL_COLS and X[col].nunique() <= MAX_NATIVE_CATEGORIES
+        for col in X.columns
+    ]
+
+
+def fit_hist(X, y):
+    return HistGradientBoostingRegressor(
+        **HIST_PARAMS,
+        categorical_features=categorical_mask(X)
+    ).fit(X, y)
+
+
+def fit_models(backend, X, y, n_jobs=1):
+    if backend == "hist":
+        return {"backend": "hist", "hgb": fit_hist(X, y)}
+    return {"backend": "rf_gb", "rf": fit_rf(X, y, n_jobs), "gb": fit_gb(X, y)}
+
+
+def _run_fold(fold, backend, X_train, y_train, X_test, y_test, n_jobs):
+    start = time.perf_counter()
+
+    models = fit_models(backend, X_train, y_train, n_jobs)
+    final_pred = predict_quantity(models, X_test)
+
+    return {
+        "fold": fold,
+        "r2": r2_score(y_test, final_pred),
+        "mae": mean_absolute_error(y_test, final_pred),
+        "seconds": time.perf_counter() - start
+    }
+
+
+def cross_validate(X, y, backend="rf_gb", n_splits=5, workers=None):
+    workers = workers or min(n_splits, cpu_count())
+    rf_jobs = max(1, cpu_count() // workers)
+
+    splits = TimeSeriesSplit(n_splits=n_splits).split(X)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _run_fold, fold, backend,
+                X.iloc[train_index], y.iloc[train_index],
+                X.iloc[test_index], y.iloc[test_index],
+                rf_jobs
+            )
+            for fold, (train_index, test_index) in enumerate(splits, start=1)
+        ]
+        return [future.result() for future in futures]
+
+
+def fit_final(backend, X, y):
+    if backend == "hist":
+        # Already multi-threaded through OpenMP
+        return fit_models("hist", X, y)
+
+    # GB trains in its own process while the forest uses the remaining cores
+    with ProcessPoolExecutor(max_workers=1) as pool:
+        gb_future = pool.submit(fit_gb, X, y)
+        rf = fit_rf(X, y, n_jobs=max(1, cpu_count() - 1))
+        gb = gb_future.result()
+    return {"backend": "rf_gb", "rf": rf, "gb": gb}
+
+
+def extend_models(models, X, y):
+    # rf_gb only. Warm-started fits only see the new rows; earlier
+    # trees/stages are kept
+    rf, gb = models["rf"], models["gb"]
+
+    rf.set_params(warm_start=True, n_estimators=len(rf.estimators_) + RF_INCREMENT, n_jobs=-1)
+    rf.fit(X, y)
+    if len(rf.estimators_) > MAX_RF_TREES:
+        rf.estimators_ = rf.estimators_[-MAX_RF_TREES:]
+        rf.set_params(n_estimators=MAX_RF_TREES)
+
+    gb.set_params(warm_start=True, n_estimators=gb.n_estimators_ + GB_INCREMENT)
+    gb.fit(X, y)
+
+    return models
@@ -0,0 +1,184 @@
+import heapq
+
+import numpy as np
+import pandas as pd
+from pymongo import ASCENDING
+
+from utils.db_handler import CATEGORICAL_FIELDS, SALES_FIELDS, iter_sales_columns
+from utils.features import FeatureBuilder, HISTORY_FEATURES
+from utils.snapshot import scan_snapshots, snapshot_item_counts
+
+# ---------------- STREAMING TRAINING LOADER ----------------
+# Sales are read in (item, date) order one cursor batch at a time. An item's
+# features are built as soon as all of its rows have arrived, so besides the
+# compact training columns only the current batch and the rows of one
+# unfinished item are held in memory.
+
+BATCH_ROWS = 50000
+
+# Raw snapshot rows read and sorted at once; the snapshot loader works
+# through items in ranges of about this many rows
+ITEM_RANGE_ROWS = 1000000
+
+# Rows of each item before the window start that are still read, only to
+# fill lag/rolling features. Counted in rows like the features themselves,
+# so items that sell on few days still get their full window.
+LOOKBACK_ROWS = FeatureBuilder().window
+
+
+def _compact(df):
+    df[HISTORY_FEATURES] = df[HISTORY_FEATURES].astype(np.float32)
+    df["day_of_week"] = df["day_of_week"].astype(np.int8)
+    df["week_of_year"] = df["week_of_year"].astype(np.int8)
+    return df
+
+
+def _training_rows(rows, start, sample, rng):
+    # rows hold complete items sorted by (item, date)
+    builder = FeatureBuilder()
+    rows = _compact(builder.add_history(builder.add_calendar(rows.reset_index(drop=True))))
+
+    keep = np.ones(len(rows), dtype=bool)
+    if start is not None:
+        keep &= (rows["date"] >= pd.Timestamp(start)).to_numpy()
+    if sample is not None:
+        keep &= rng.random(len(rows)) < sample
+    return rows[keep]
+
+
+def _build_frame(batches, lookups, start, sample, rng):
+    # batches yield typed columns in (item, date) order, categoricals as
+    # int32 codes into lookups (see db_handler.iter_sales_columns)
+    parts = []
+    pending = None
+
+    for columns in batches:
+        batch = pd.DataFrame(columns)
+        if pending is not None:
+            batch = pd.concat([pending, batch], ignore_index=True)
+
+        # Rows of the last item may continue in the next batch
+        complete = (batch["item"] != batch["item"].iat[-1]).to_numpy()
+        pending = batch[~complete]
+
+        if complete.any():
+            parts.append(_training_rows(batch[complete], start, sample, rng))
+
+    if pending is not None and len(pending):
+        parts.append(_training_rows(pending, start, sample, rng))
+
+    if not parts:
+        return pd.DataFrame()
+
+    df = pd.concat(parts, ignore_index=True)
+    for field in CATEGORICAL_FIELDS:
+        df[field] = pd.Categorical.from_codes(
+            df[field], categories=list(lookups[field])
+        ).remove_unused_categories()
+
+    return df
+
+
+def stream_training_frame(db, query=None, start=None, sample=None, seed=42, batch_rows=BATCH_ROWS):
+    # Feature frame for training, optionally limited to rows on/after start
+    # and/or Bernoulli-downsampled to a `sample` fraction of rows. Sampling
+    # happens after features are built so lags still see every row.
+    query = dict(query or {})
+    lookback = []
+    if start is not None:
+        start = pd.Timestamp(start).to_pydatetime()
+        lookback = _lookback_docs(db, query, start)
+        query["date"] = {"$gte": start}
+
+    lookups = {field: {} for field in CATEGORICAL_FIELDS}
+
+    cursor = db.sales.find(
+        query, {"_id": 0, **{field: 1 for field in SALES_FIELDS}},
+        sort=[("item", ASCENDING), ("date", ASCENDING)],
+        batch_size=batch_rows, allow_disk_use=True
+    )
+    if lookback:
+        # Both are in (item, date) order and an item's lookback rows all
+        # come before its first row in the window
+        cursor = heapq.merge(lookback, cursor, key=lambda doc: (doc["item"], doc["date"]))
+
+    return _build_frame(
+        iter_sales_columns(cursor, SALES_FIELDS, lookups, batch_rows),
+        lookups, start, sample, np.random.default_rng(seed)
+    )
+
+
+def _lookback_docs(db, query, start):
+    # Trailing LOOKBACK_ROWS sales of every item before start, picked server
+    # side with $topN (MongoDB 5.2+), in (item, date) order
+    pipeline = [
+        {"$match": {**query, "date": {"$lt": start}}},
+        {"$group": {
+            "_id": "$item",
+            "rows": {"$topN": {
+                "n": LOOKBACK_ROWS,
+                "sortBy": {"date": -1},
+                "output": {field: f"${field}" for field in SALES_FIELDS}
+            }}
+        }}
+    ]
+    docs = [doc for group in db.sales.aggregate(pipeline, allowDiskUse=True) for doc in group["rows"]]
+    return sorted(docs, key=lambda doc: (doc["item"], doc["date"]))
+
+
+def _table_columns(table, lookups):
+    # Arrow columns as the typed numpy columns iter_sales_columns yields;
+    # strings become int32 codes into lookups, which grows across tables
+    columns = {}
+    for field in SALES_FIELDS:
+        column = table[field].combine_chunks()
+        if field in CATEGORICAL_FIELDS:
+            encoded = column.dictionary_encode()
+            codes = np.array(
+                [lookups[field].setdefault(value, len(lookups[field])) for value in encoded.dictionary.to_pylist()]
+                + [-1],
+                dtype=np.int32
+            )
+            # Nulls index the trailing -1
+            columns[field] = codes[encoded.indices.fill_null(-1).to_numpy(zero_copy_only=False)]
+        else:
+            columns[field] = column.to_numpy(zero_copy_only=False)
+    return columns
+
+
+def _item_ranges(counts, range_rows):
+    # [item_from, item_to) bounds covering every item name, each holding
+    # about range_rows rows (more when a single item has more). The outer
+    # bounds stay open so items written since counting are not skipped.
+    bounds = []
+    rows = 0
+    for item in sorted(counts):
+        if rows and rows + counts[item] > range_rows:
+            bounds.append(item)
+            rows = 0
+        rows += counts[item]
+    return list(zip([None] + bounds, bounds + [None]))
+
+
+def snapshot_training_frame(owner_ids, start=None, sample=None, seed=42, batch_rows=BATCH_ROWS,
+                            range_rows=ITEM_RANGE_ROWS):
+    # Same frame as stream_training_frame, read from the local Parquet
+    # snapshots (refreshed by the caller). Items are read in name ranges of
+    # about range_rows rows, so only one range's raw rows are held and sorted
+    # at a time, at the cost of one filtered scan of the snapshots per range.
+    # Every item's full history is read so lags before start are exact; rows
+    # before start are dropped after features are built.
+    lookups = {field: {} for field in CATEGORICAL_FIELDS}
+
+    def batches():
+        for item_from, item_to in _item_ranges(snapshot_item_counts(owner_ids), range_rows):
+            table = scan_snapshots(owner_ids, columns=SALES_FIELDS, item_from=item_from, item_to=item_to)
+            columns = _table_columns(
+                table.sort_by([("item", "ascending"), ("date", "ascending")]), lookups
+            )
+            del table
+
+            for offset in range(0, len(columns["date"]), batch_rows):
+                yield {field: column[offset:offset + batch_rows] for field, column in columns.items()}
+
+    return _build_frame(batches(), lookups, start, sample, np.random.default_rng(seed))